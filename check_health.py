@@ -2,32 +2,100 @@
 # PYTHON_ARGCOMPLETE_OK
 
 import argparse
+import os
 import subprocess
 import sys
+import tempfile
 import argcomplete
 import tabulate
+import common
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 
-def run_check(script_name, description, fix=False, verbose=False):
+def print_header(description):
     print(f"\n{'='*60}")
     print(f"Running: {description}")
     print(f"{'='*60}")
 
+
+def run_check(
+    script_name,
+    description,
+    fix=False,
+    verbose=False,
+    capture=False,
+    env=None,
+    use_cache=True,
+):
+    """
+    Runs a single check script.
+    Returns (returncode, output). When capture is False the script writes
+    directly to the terminal and output is None.
+    """
+    if not capture:
+        print_header(description)
+
     cmd = ["./" + script_name]
     if fix:
         cmd.append("--fix")
     if verbose:
         cmd.append("--verbose")
+    if not use_cache:
+        cmd.append("--no-cache")
 
     try:
-        result = subprocess.run(cmd, check=False)
-        return result.returncode
+        if capture:
+            result = subprocess.run(
+                cmd,
+                check=False,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                stdin=subprocess.DEVNULL,
+                text=True,
+                env=env,
+            )
+            return result.returncode, result.stdout
+        result = subprocess.run(cmd, check=False, env=env)
+        return result.returncode, None
     except FileNotFoundError:
-        print(f"Error: Script {script_name} not found.")
-        return -1
+        return -1, f"Error: Script {script_name} not found.\n"
     except Exception as e:
-        print(f"Error running {script_name}: {e}")
-        return -1
+        return -1, f"Error running {script_name}: {e}\n"
+
+
+def run_checks(checks, fix=False, verbose=False, env=None, use_cache=True):
+    """
+    Runs all checks.
+    Returns a dictionary of return codes indexed by check description.
+    """
+    codes = {}
+    if fix:
+        # --fix prompts on stdin, so the checks must run one at a time
+        for script, desc in checks:
+            code, output = run_check(
+                script, desc, fix, verbose, env=env, use_cache=use_cache
+            )
+            if output:
+                print(output, end="")
+            codes[desc] = code
+    else:
+        # Each check is I/O-bound on its own websocket, so run them concurrently
+        # and print each check's buffered output as it finishes.
+        with ThreadPoolExecutor(max_workers=len(checks)) as executor:
+            futures = {
+                executor.submit(
+                    run_check, script, desc, fix, verbose, True, env, use_cache
+                ): desc
+                for script, desc in checks
+            }
+            for future in as_completed(futures):
+                desc = futures[future]
+                code, output = future.result()
+                print_header(desc)
+                if output:
+                    print(output, end="")
+                codes[desc] = code
+    return codes
 
 
 def main():
@@ -40,8 +108,18 @@ def main():
         action="store_true",
         help="Attempt to auto-fix broken references interactively",
     )
+    parser.add_argument(
+        "--no-cache",
+        dest="use_cache",
+        action="store_false",
+        help="Ignore cached entities, services and configs from previous runs",
+    )
     argcomplete.autocomplete(parser)
     args = parser.parse_args()
+    # Fixes write to Home Assistant, so they must see its current state: the
+    # registry cache is only trusted for report-only runs
+    if not args.use_cache or args.fix:
+        common.REGISTRY_CACHE_TTL = 0
 
     checks = [
         ("find_broken_automations.py", "Checking Automations"),
@@ -50,10 +128,21 @@ def main():
         ("find_broken_dashboards.py", "Checking Dashboards"),
     ]
 
-    results = []
-    for script, desc in checks:
-        code = run_check(script, desc, args.fix, args.verbose)
-        results.append((desc, code))
+    # Fetch the entity/service registries once and share them with every check
+    snapshot_fd, snapshot_path = tempfile.mkstemp(suffix=".json")
+    os.close(snapshot_fd)
+    try:
+        env = None
+        print("Fetching entities and services...")
+        with common.websocket_context() as ws:
+            if ws and common.write_registry_snapshot(ws, snapshot_path):
+                env = dict(os.environ, **{common.REGISTRY_SNAPSHOT_ENV: snapshot_path})
+
+        codes = run_checks(checks, args.fix, args.verbose, env, args.use_cache)
+    finally:
+        os.remove(snapshot_path)
+
+    results = [(desc, codes[desc]) for _, desc in checks]
 
     print(f"\n{'='*60}")
     print("Health Check Summary")
@@ -1,66 +1,122 @@
-import json
+import orjson
+import os
+import shelve
 import ssl
+import threading
+import time
 import websocket
 import config
-import difflib
-import requests
+import functools
 import re
-from typing import List, Dict, Set, Tuple, Optional, Any, Union
+from typing import List, Dict, Set, Tuple, Optional, Any, Union, Iterator, Callable
+from typing import TYPE_CHECKING
+from collections import Counter, namedtuple
+from itertools import chain
 from contextlib import contextmanager
 
+if TYPE_CHECKING:
+    import requests  # Imported lazily at runtime, see get_http_session
+
 # Determine the protocol based on TLS configuration
 TLS_S = "s" if config.TLS else ""
 
+# Maximum number of pipelined websocket requests awaiting a reply. Home
+# Assistant drops clients that let too many replies queue up unread.
+WS_MAX_IN_FLIGHT = 256
+
+# Tables with fewer rows than this are always rendered by tabulate; larger
+# plain-text tables are rendered directly (see format_github_table)
+GITHUB_TABLE_MIN_ROWS = 100
+
+# Environment variable pointing child scripts at a registry snapshot file
+# written by check_health.py, so they skip re-downloading the registries
+REGISTRY_SNAPSHOT_ENV = "HA_REGISTRY_SNAPSHOT"
+
+# Directory for on-disk caches that persist between runs
+CACHE_DIR = os.path.expanduser("~/.cache/ha-entity-renamer")
+
+# Seconds that fetched entity/service lists stay valid on disk (0 disables).
+# Scripts disable it for --fix runs, which write to Home Assistant
+REGISTRY_CACHE_TTL = 300
+
 # List of references to ignore (known false positives or intentionally missing)
-IGNORED_REFERENCES = {
-    "todo.add_item",  # Often flagged if no todo lists are active
-}
+IGNORED_REFERENCES = frozenset(
+    {
+        "todo.add_item",  # Often flagged if no todo lists are active
+    }
+)
 
 # Regex patterns for entity ID matching
 ENTITY_ID_PATTERN = r"^[a-z0-9_]+\.[a-z0-9_]+$"
-ENTITY_ID_IN_QUOTES_PATTERN = r'"([a-z0-9_]+\.[a-z0-9_]+)"'
-COMMON_FALSE_POSITIVES = {
-    "platform.state",
-    "platform.numeric_state",
-    "platform.template",
-    "platform.time",
-    "platform.sun",
-    "platform.zone",
-    "platform.webhook",
-    "platform.mqtt",
-}
+ENTITY_ID_RE = re.compile(ENTITY_ID_PATTERN)
+# Matches a whole config string that looks like "domain.name" (use fullmatch)
+ENTITY_ID_VALUE_RE = re.compile(r"[a-z0-9_]+\.[a-z0-9_]+", re.IGNORECASE)
+COMMON_FALSE_POSITIVES = frozenset(
+    {
+        "platform.state",
+        "platform.numeric_state",
+        "platform.template",
+        "platform.time",
+        "platform.sun",
+        "platform.zone",
+        "platform.webhook",
+        "platform.mqtt",
+    }
+)
 
 # Known service domains
-KNOWN_SERVICE_DOMAINS = {
-    "homeassistant",
-    "system_log",
-    "logger",
-    "persistent_notification",
-    "notify",
-    "tts",
-    "frontend",
-    "recorder",
-    "history",
-    "logbook",
-}
+KNOWN_SERVICE_DOMAINS = frozenset(
+    {
+        "homeassistant",
+        "system_log",
+        "logger",
+        "persistent_notification",
+        "notify",
+        "tts",
+        "frontend",
+        "recorder",
+        "history",
+        "logbook",
+    }
+)
 
 # Common service verbs
-COMMON_SERVICE_VERBS = {
-    "turn_on",
-    "turn_off",
-    "toggle",
-    "stop",
-    "start",
-    "restart",
-    "reload",
-    "create",
-    "delete",
-    "add_item",
-    "remove_item",
-    "snapshot",
-    "play_media",
-    "trigger",
-}
+COMMON_SERVICE_VERBS = frozenset(
+    {
+        "turn_on",
+        "turn_off",
+        "toggle",
+        "stop",
+        "start",
+        "restart",
+        "reload",
+        "create",
+        "delete",
+        "add_item",
+        "remove_item",
+        "snapshot",
+        "play_media",
+        "trigger",
+    }
+)
+
+# Suffixes that might have been removed from entity IDs during a reset
+SUFFIXES = (
+    "_switch",
+    "_light",
+    "_sensor",
+    "_binary_sensor",
+    "_cover",
+    "_fan",
+    "_lock",
+    "_climate",
+    "_media_player",
+)
+NORMALIZE_RE = re.compile(r"[_\-]")
+SUFFIX_RE = re.compile("(?:" + "|".join(re.escape(s) for s in SUFFIXES) + ")$")
+
+# A potentially broken reference and the automation/script it was found in
+BrokenRef = namedtuple("BrokenRef", ["source", "ref"])
 
 # User prompt messages
 PROMPT_APPLY_FIX = "  Apply a fix? (1-{max_suggestions}/N): "
@@ -73,29 +129,34 @@ def is_ignored(ref: str) -> bool:
     """
     Checks if a reference should be ignored.
     """
-    if ref in IGNORED_REFERENCES:
-        return True
-    return False
+    return ref in IGNORED_REFERENCES
 
 
+@functools.lru_cache(maxsize=4096)
 def is_likely_service(ref: str) -> bool:
     """
     Determines if a reference is likely a service call rather than an entity.
     Checks against known service domains and common service verbs.
+    Cached, since the same broken reference is classified once per occurrence.
     """
-    if "." not in ref:
+    domain, sep, name = ref.partition(".")
+    if not sep:
         return False
-    domain, name = ref.split(".", 1)
 
-    # Check if domain is a known service domain
-    if domain in KNOWN_SERVICE_DOMAINS:
-        return True
+    # Known service domain, or a common service verb
+    return domain in KNOWN_SERVICE_DOMAINS or name in COMMON_SERVICE_VERBS
 
-    # Check if the service verb is common
-    if name in COMMON_SERVICE_VERBS:
-        return True
 
-    return False
+def entity_id_matcher(search_regex: str) -> Callable[[str], Any]:
+    """
+    Returns a predicate that tells whether an entity ID matches search_regex,
+    like re.search. Patterns without metacharacters (usually a plain word such
+    as 'kitchen') are matched with a substring test instead of the regex
+    engine.
+    """
+    if re.escape(search_regex) == search_regex:
+        return lambda entity_id: search_regex in entity_id
+    return re.compile(search_regex).search
 
 
 def prompt_apply_fix(num_suggestions: int) -> str:
@@ -131,6 +192,89 @@ def prompt_apply_fix_with_delete(num_suggestions: int) -> str:
     return input(PROMPT_APPLY_FIX_WITH_DELETE.format(max_suggestions=num_suggestions))
 
 
+class ConfigCache:
+    """
+    Thread-safe on-disk cache of config objects that persists between runs.
+    Entries are keyed by entity ID and only returned while their version
+    (e.g. the entity state's last_updated) still matches. Versions must come
+    from a live get_states in the same run, never from the registry cache.
+
+    Usage:
+        with ConfigCache("automations") as cache:
+            config_data = cache.get(entity_id, version)
+    """
+
+    def __init__(self, name: str):
+        self._lock = threading.Lock()
+        self._shelf = None
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            self._shelf = shelve.open(os.path.join(CACHE_DIR, name))
+        except Exception as e:
+            print(f"Config cache unavailable, continuing without it: {e}")
+
+    def get(self, key: str, version: str) -> Optional[Dict[str, Any]]:
+        if self._shelf is None:
+            return None
+        with self._lock:
+            entry = self._shelf.get(key)
+        if entry is None or entry[0] != version:
+            return None
+        return entry[1]
+
+    def set(self, key: str, version: str, value: Dict[str, Any]) -> None:
+        if self._shelf is None:
+            return
+        with self._lock:
+            self._shelf[key] = (version, value)
+
+    def discard(self, key: str) -> None:
+        if self._shelf is None:
+            return
+        with self._lock:
+            self._shelf.pop(key, None)
+
+    def close(self) -> None:
+        if self._shelf is not None:
+            with self._lock:
+                self._shelf.close()
+                self._shelf = None
+
+    def __enter__(self) -> "ConfigCache":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+def discard_cached_config(name: str, entity_id: str) -> None:
+    """
+    Drops entity_id's entry from the named ConfigCache, e.g. after its config
+    was saved, so the next run fetches it again.
+    """
+    with ConfigCache(name) as cache:
+        cache.discard(entity_id)
+
+
+@functools.lru_cache(maxsize=None)
+def get_http_session() -> "requests.Session":
+    """
+    Returns the shared HTTP session, so REST calls reuse one keep-alive
+    connection. requests is imported on first use: most runs only talk
+    websocket and never pay for it.
+    """
+    import requests
+
+    session = requests.Session()
+    session.headers.update(
+        {
+            "Authorization": f"Bearer {config.ACCESS_TOKEN}",
+            "Content-Type": "application/json",
+        }
+    )
+    return session
+
+
 @contextmanager
 def websocket_context():
     """
@@ -156,7 +300,14 @@ def connect_websocket() -> Optional[websocket.WebSocket]:
     """
     websocket_url = f"ws{TLS_S}://{config.HOST}/api/websocket"
     sslopt = {"cert_reqs": ssl.CERT_NONE} if not config.SSL_VERIFY else {}
-    ws = websocket.WebSocket(sslopt=sslopt)
+    # Text frames are decoded as UTF-8 on receipt anyway; without wsaccel the
+    # library's extra validation pass is pure Python over every byte, which
+    # dominates receiving large registry/state payloads.
+    # Every tool drives its connection from a single thread, so the per-frame
+    # send/recv locks are skipped too.
+    ws = websocket.WebSocket(
+        sslopt=sslopt, skip_utf8_validation=True, enable_multithread=False
+    )
     try:
         ws.connect(websocket_url)
     except Exception as e:
@@ -166,10 +317,10 @@ def connect_websocket() -> Optional[websocket.WebSocket]:
     auth_req = ws.recv()
 
     # Authenticate with Home Assistant
-    auth_msg = json.dumps({"type": "auth", "access_token": config.ACCESS_TOKEN})
+    auth_msg = orjson.dumps({"type": "auth", "access_token": config.ACCESS_TOKEN})
     ws.send(auth_msg)
     auth_result = ws.recv()
-    auth_result = json.loads(auth_result)
+    auth_result = orjson.loads(auth_result)
     if auth_result["type"] != "auth_ok":
         print("Authentication failed. Check your access token.")
         ws.close()
@@ -187,112 +338,486 @@ def align_strings(table: List[Tuple[Any, ...]]) -> List[Tuple[Any, ...]]:
     if len(table) == 0:
         return table
 
-    for column in range(len(table[0])):
-        # Get the column data from the table
-        column_data = [row[column] for row in table]
+    # Work column by column on a transposed copy; zip does both transposes
+    # in C, and columns without a delimiter are passed through untouched
+    columns = list(zip(*table))
 
-        # Find the maximum length of the first part of the split strings
-        strings_to_align = [
-            s for s in column_data if isinstance(s, str) and alignment_char in s
+    for column, cells in enumerate(columns):
+        # Find each cell's delimiter position once; both passes reuse it
+        indexes = [
+            cell.find(alignment_char) if isinstance(cell, str) else -1 for cell in cells
         ]
-        if len(strings_to_align) == 0:
+        # Maximum length of the first part of the split strings
+        max_length = max(indexes)
+        if max_length < 0:
             continue
 
-        max_length = max([len(s.split(alignment_char)[0]) for s in strings_to_align])
+        columns[column] = [
+            cell[:index].rjust(max_length) + cell[index:] if index >= 0 else cell
+            for cell, index in zip(cells, indexes)
+        ]
 
-        def align_string(s: Any) -> Any:
-            if not isinstance(s, str):
-                return s
-            s_split = s.split(alignment_char, maxsplit=1)
-            if len(s_split) == 1:
-                return s
-            else:
-                return f"{s_split[0]:>{max_length}}.{s_split[1]}"
+    return list(zip(*columns))
+
+
+def format_github_table(rows: List[Tuple[Any, ...]], headers: Tuple[str, ...]) -> str:
+    """
+    Renders rows like tabulate.tabulate(rows, headers, tablefmt="github").
+    Large tables of plain single-line ASCII text are built directly with
+    str.join, since tabulate's per-cell passes dominate printing thousands of
+    rows. Anything else (small tables, numbers, missing values, wide or
+    multi-line text) goes through tabulate itself.
+    """
+    import tabulate
+
+    if (
+        len(rows) < GITHUB_TABLE_MIN_ROWS
+        or not tabulate.PRESERVE_WHITESPACE
+        or not _is_plain_text_table(rows, headers)
+    ):
+        return tabulate.tabulate(rows, headers=headers, tablefmt="github")
+
+    # tabulate pads every header by at least MIN_PADDING (2)
+    widths = [
+        max(len(header) + 2, max(map(len, column)))
+        for header, column in zip(headers, zip(*rows))
+    ]
+    lines = [
+        "| " + " | ".join(h.ljust(w) for h, w in zip(headers, widths)) + " |",
+        "|" + "|".join("-" * (w + 2) for w in widths) + "|",
+    ]
+    for row in rows:
+        lines.append("| " + " | ".join(c.ljust(w) for c, w in zip(row, widths)) + " |")
+    return "\n".join(lines)
+
+
+def _is_plain_text_table(rows: List[Tuple[Any, ...]], headers: Tuple[str, ...]) -> bool:
+    """
+    Checks that format_github_table can render rows without tabulate: every
+    cell is a single-line ASCII string without escape codes, and every
+    column is typed as text (tabulate right-aligns all-numeric columns).
+    """
+    if any(len(row) != len(headers) for row in rows):
+        return False
+    try:
+        text = "\t".join(chain(headers, chain.from_iterable(rows)))
+    except TypeError:
+        return False  # Non-string cells
+    if not text.isascii() or "\n" in text or "\r" in text or "\x1b" in text:
+        return False
+
+    for column in zip(*rows):
+        # One cell that can't parse as a number (or bool) makes the whole
+        # column text; that's usually the first one
+        for cell in column:
+            if cell and "," not in cell and cell not in ("True", "False"):
+                try:
+                    float(cell)
+                except ValueError:
+                    break
+        else:
+            if any(column):
+                return False
+    return True
+
+
+def ws_batch(
+    ws: websocket.WebSocket,
+    payloads: List[Dict[str, Any]],
+    max_in_flight: int = WS_MAX_IN_FLIGHT,
+) -> Dict[int, Dict[str, Any]]:
+    """
+    Pipelines payloads over the websocket: up to max_in_flight requests are
+    outstanding at once, and each reply frees a slot for the next request.
+    Each payload must carry a unique "id".
+    Returns a dictionary of result messages indexed by message id.
+    """
+    return dict(ws_batch_iter(ws, payloads, max_in_flight))
+
+
+def ws_batch_iter(
+    ws: websocket.WebSocket,
+    payloads: List[Dict[str, Any]],
+    max_in_flight: int = WS_MAX_IN_FLIGHT,
+) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """
+    Same as ws_batch, but yields (message id, result message) pairs as the
+    replies arrive, so callers can process early replies while later ones
+    are still in flight.
+    """
+    pending = {payload["id"] for payload in payloads}
+    sent = 0
+    received = 0
+    while pending:
+        # Top up the window before waiting for the next reply
+        while sent < len(payloads) and sent - received < max_in_flight:
+            ws.send(orjson.dumps(payloads[sent]))
+            sent += 1
+
+        # recv_data hands back the raw frame payload; orjson parses the bytes
+        # directly instead of recv() decoding them to a str first
+        result = orjson.loads(ws.recv_data()[1])
+        reply_id = result.get("id")
+        if reply_id in pending:
+            pending.discard(reply_id)
+            received += 1
+            yield reply_id, result
+
+
+def ws_request(
+    ws: websocket.WebSocket, payload: Dict[str, Any], msg_id: int
+) -> Tuple[Dict[str, Any], int]:
+    """
+    Sends a single request, tagged with the next message id, and waits for
+    its reply. Messages with any other id are skipped.
+    Returns the result message and the updated msg_id.
+    """
+    msg_id += 1
+    results = ws_batch(ws, [{"id": msg_id, **payload}])
+    return results[msg_id], msg_id
+
+
+@functools.lru_cache(maxsize=None)
+def load_registry_snapshot() -> Optional[Dict[str, Any]]:
+    """
+    Loads the registry snapshot named by REGISTRY_SNAPSHOT_ENV, if any.
+    Returns the snapshot dict, or None if unset or unreadable.
+    """
+    path = os.environ.get(REGISTRY_SNAPSHOT_ENV)
+    if not path:
+        return None
+    try:
+        with open(path, "rb") as f:
+            return orjson.loads(f.read())
+    except (OSError, orjson.JSONDecodeError) as e:
+        print(f"Ignoring registry snapshot {path}: {e}")
+        return None
+
+
+def write_registry_snapshot(ws: websocket.WebSocket, path: str) -> bool:
+    """
+    Fetches valid entities (with state versions) and services once and writes
+    them to path for get_valid_entities/get_valid_services to reuse.
+    Returns True if successful.
+    """
+    state_versions = {}
+    entities, services, _ = get_valid_entities_and_services(ws, 1, state_versions)
+    snapshot = {
+        "entities": sorted(entities),
+        "state_versions": state_versions,
+        "services": sorted(services),
+    }
+    try:
+        with open(path, "wb") as f:
+            f.write(orjson.dumps(snapshot))
+    except OSError as e:
+        print(f"Failed to write registry snapshot {path}: {e}")
+        return False
+    return True
+
+
+def registry_cache_path(name: str) -> str:
+    """
+    Returns the on-disk registry cache file for name, keyed by host.
+    """
+    host = re.sub(r"[^A-Za-z0-9_.-]", "_", config.HOST)
+    return os.path.join(CACHE_DIR, f"{host}-{name}.json")
 
-        # Create the modified table by replacing the column with aligned strings
-        table = [
-            tuple(
-                align_string(value) if i == column else value
-                for i, value in enumerate(row)
-            )
-            for row in table
-        ]
 
-    return table
+def read_registry_cache(name: str) -> Optional[Dict[str, Any]]:
+    """
+    Reads a registry cache entry written less than REGISTRY_CACHE_TTL ago.
+    Returns the cached data, or None if disabled, missing or expired.
+    """
+    if REGISTRY_CACHE_TTL <= 0:
+        return None
+    try:
+        with open(registry_cache_path(name), "rb") as f:
+            entry = orjson.loads(f.read())
+    except (OSError, orjson.JSONDecodeError):
+        return None
+    if time.time() - entry.get("ts", 0) >= REGISTRY_CACHE_TTL:
+        return None
+    return entry.get("data")
 
 
-def get_valid_entities(ws: websocket.WebSocket, msg_id: int) -> Tuple[Set[str], int]:
+def write_registry_cache(name: str, data: Dict[str, Any]) -> None:
+    """
+    Stores data in the registry cache for read_registry_cache.
+    """
+    if REGISTRY_CACHE_TTL <= 0:
+        return
+    path = registry_cache_path(name)
+    # Write to a temporary file and rename it into place, so a concurrent
+    # reader (e.g. another checker run by check_health) never sees a
+    # partially written cache
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(tmp_path, "wb") as f:
+            f.write(orjson.dumps({"ts": time.time(), "data": data}))
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Failed to write registry cache: {e}")
+
+
+def clear_registry_cache() -> None:
+    """
+    Removes the cached entity/service lists and registries, e.g. after
+    renaming entities.
+    """
+    for name in ("entities", "services", "entity_registry", "device_registry"):
+        try:
+            os.remove(registry_cache_path(name))
+        except FileNotFoundError:
+            pass
+
+
+def get_valid_entities(
+    ws: websocket.WebSocket,
+    msg_id: int,
+    state_versions: Optional[Dict[str, str]] = None,
+) -> Tuple[Set[str], int]:
     """
     Fetches all valid entity IDs from the Entity Registry and the State Machine.
+    If state_versions is given, it is filled with each state's last_updated.
+    Uses the registry snapshot or a fresh on-disk cache instead when available;
+    the on-disk cache is skipped when state_versions is wanted, since config
+    caches trust those versions and they must be current.
     Returns a set of entity IDs and the updated msg_id.
     """
-    # Get registry entities
-    msg_id += 1
-    ws.send(json.dumps({"id": msg_id, "type": "config/entity_registry/list"}))
-    result = ws.recv()
-    result = json.loads(result)
+    cached = load_registry_snapshot()
+    if not cached and state_versions is None:
+        cached = read_registry_cache("entities")
+    if cached:
+        if state_versions is not None:
+            state_versions.update(cached["state_versions"])
+        return set(cached["entities"]), msg_id
+
+    registry_id = msg_id + 1
+    states_id = msg_id + 2
+    msg_id = states_id
+    results = ws_batch(ws, _valid_entities_payloads(registry_id, states_id))
+    entities = _valid_entities_from_results(
+        results[registry_id], results[states_id], state_versions
+    )
+    return entities, msg_id
+
+
+def get_valid_entities_and_services(
+    ws: websocket.WebSocket,
+    msg_id: int,
+    state_versions: Optional[Dict[str, str]] = None,
+) -> Tuple[Set[str], Set[str], int]:
+    """
+    Same as get_valid_entities followed by get_valid_services, but pipelines
+    all three requests so both lists arrive in a single round trip.
+    Returns the entity set, the service set and the updated msg_id.
+    """
+    if (
+        load_registry_snapshot()
+        or (state_versions is None and read_registry_cache("entities"))
+        or read_registry_cache("services")
+    ):
+        # At most one of them still needs the network
+        entities, msg_id = get_valid_entities(ws, msg_id, state_versions)
+        services, msg_id = get_valid_services(ws, msg_id)
+        return entities, services, msg_id
+
+    registry_id = msg_id + 1
+    states_id = msg_id + 2
+    services_id = msg_id + 3
+    msg_id = services_id
+    results = ws_batch(
+        ws,
+        _valid_entities_payloads(registry_id, states_id)
+        + [{"id": services_id, "type": "get_services"}],
+    )
+    entities = _valid_entities_from_results(
+        results[registry_id], results[states_id], state_versions
+    )
+    services = _valid_services_from_result(results[services_id])
+    return entities, services, msg_id
+
+
+def _valid_entities_payloads(registry_id: int, states_id: int) -> List[Dict[str, Any]]:
+    """
+    Returns the registry and state requests behind get_valid_entities.
+    """
+    return [
+        {"id": registry_id, "type": "config/entity_registry/list"},
+        # Includes non-registry items like zone.home, sun.sun
+        {"id": states_id, "type": "get_states"},
+    ]
+
 
+def _valid_entities_from_results(
+    registry_result: Dict[str, Any],
+    states_result: Dict[str, Any],
+    state_versions: Optional[Dict[str, str]],
+) -> Set[str]:
+    """
+    Builds the valid entity set from the registry and state replies, and
+    caches it on disk if both requests succeeded.
+    """
+    # Get registry entities
+    result = registry_result
+    complete = result["success"]
     entities = set()
     if result["success"]:
         entities = {e["entity_id"] for e in result["result"]}
     else:
         print("Failed to list registry entities.")
 
-    # Get state entities (includes non-registry items like zone.home, sun.sun)
-    msg_id += 1
-    ws.send(json.dumps({"id": msg_id, "type": "get_states"}))
-    result = ws.recv()
-    result = json.loads(result)
-
+    # Get state entities
+    result = states_result
+    complete = complete and result["success"]
+    versions = {}
     if result["success"]:
         for e in result["result"]:
             entities.add(e["entity_id"])
+            versions[e["entity_id"]] = e.get("last_updated")
     else:
         print("Failed to list states.")
 
-    return entities, msg_id
+    if state_versions is not None:
+        state_versions.update(versions)
+    if complete:
+        write_registry_cache("entities", {"entities": sorted(entities)})
+
+    return entities
 
 
-def suggest_fix(broken_ref: str, valid_entities: Set[str]) -> List[str]:
+def build_domain_index(valid_entities: Set[str]) -> Dict[str, List[str]]:
+    """
+    Groups entity IDs by domain so suggest_fix can look up same-domain
+    candidates without scanning every entity.
     """
-    Suggests potential fixes for a broken entity reference using fuzzy matching
-    and common suffix removal.
+    domain_index = {}
+    for entity_id in valid_entities:
+        domain = entity_id.partition(".")[0]
+        entities = domain_index.get(domain)
+        if entities is None:
+            domain_index[domain] = [entity_id]
+        else:
+            entities.append(entity_id)
+    return domain_index
+
+
+def normalize_entity_id(entity_id: str) -> str:
+    """
+    Normalizes an entity ID for loose comparison: lowercase, no '_' or '-'.
+    """
+    return NORMALIZE_RE.sub("", entity_id.lower())
+
+
+def build_normalized_index(valid_entities: Set[str]) -> Dict[str, str]:
+    """
+    Maps normalized entity IDs (see normalize_entity_id) to the real entity ID
+    so suggest_fix can resolve case/underscore typos with a dict lookup.
+    """
+    return {normalize_entity_id(e): e for e in valid_entities}
+
+
+def name_trigrams(entity_id: str) -> Set[str]:
     """
-    if "." not in broken_ref:
+    Returns the distinct 3-character substrings of an entity ID's name
+    (the part after the domain).
+    """
+    name = entity_id.partition(".")[2]
+    return {name[i : i + 3] for i in range(len(name) - 2)}
+
+
+def build_trigram_index(
+    valid_entities: Set[str],
+) -> Dict[str, Dict[str, List[str]]]:
+    """
+    Maps each domain to an inverted index of name trigrams, so suggest_fix
+    only fuzzy-matches entities that share some of the broken name's text.
+    """
+    trigram_index = {}
+    for entity_id in valid_entities:
+        domain = entity_id.partition(".")[0]
+        postings = trigram_index.get(domain)
+        if postings is None:
+            postings = trigram_index[domain] = {}
+        for trigram in name_trigrams(entity_id):
+            entities = postings.get(trigram)
+            if entities is None:
+                postings[trigram] = [entity_id]
+            else:
+                entities.append(entity_id)
+    return trigram_index
+
+
+def suggest_fix(
+    broken_ref: str,
+    valid_entities: Set[str],
+    domain_index: Optional[Dict[str, List[str]]] = None,
+    normalized_index: Optional[Dict[str, str]] = None,
+    trigram_index: Optional[Dict[str, Dict[str, List[str]]]] = None,
+) -> List[str]:
+    """
+    Suggests potential fixes for a broken entity reference.
+    Cheap lookups (normalized match, common suffix removal) are tried first;
+    fuzzy matching only runs if they find nothing.
+    Pass a domain_index from build_domain_index, a normalized_index from
+    build_normalized_index and a trigram_index from build_trigram_index
+    when calling repeatedly.
+    """
+    if "." not in broken_ref or broken_ref in valid_entities:
         return []
 
     domain, name = broken_ref.split(".", 1)
     suggestions = []
 
-    # 1. Fuzzy matching using difflib
-    # Filter valid entities to only those in the same domain to improve accuracy
-    same_domain_entities = [e for e in valid_entities if e.startswith(f"{domain}.")]
-
-    matches = difflib.get_close_matches(
-        broken_ref, same_domain_entities, n=3, cutoff=0.6
-    )
-    suggestions.extend(matches)
-
-    # 2. Common suffixes that might have been removed during a reset
-    suffixes = [
-        "_switch",
-        "_light",
-        "_sensor",
-        "_binary_sensor",
-        "_cover",
-        "_fan",
-        "_lock",
-        "_climate",
-        "_media_player",
-    ]
-
-    # Try removing suffixes
-    for suffix in suffixes:
-        if name.endswith(suffix):
-            new_name = name[: -len(suffix)]
-            candidate = f"{domain}.{new_name}"
-            if candidate in valid_entities:
-                suggestions.append(candidate)
+    # 1. Same ID apart from case, underscores or dashes
+    if normalized_index is None:
+        normalized_index = build_normalized_index(valid_entities)
+    candidate = normalized_index.get(normalize_entity_id(broken_ref))
+    if candidate:
+        suggestions.append(candidate)
+
+    # 2. Try removing common suffixes that might have been removed during a reset
+    # One regex search rules out most names; the loop keeps overlapping
+    # suffixes (e.g. "_sensor" and "_binary_sensor") as separate candidates.
+    if SUFFIX_RE.search(name):
+        for suffix in SUFFIXES:
+            if name.endswith(suffix):
+                new_name = name[: -len(suffix)]
+                candidate = f"{domain}.{new_name}"
+                if candidate in valid_entities:
+                    suggestions.append(candidate)
+
+    # 3. Fuzzy matching using difflib, only if nothing cheaper matched
+    if not suggestions:
+        # Filter valid entities to only those in the same domain to improve accuracy
+        if domain_index is not None:
+            same_domain_entities = domain_index.get(domain, [])
+        else:
+            same_domain_entities = [
+                e for e in valid_entities if e.startswith(f"{domain}.")
+            ]
+
+        import difflib
+
+        # Score the entities sharing at least two name trigrams first; only
+        # fall back to the whole domain if none of them is close enough
+        if trigram_index is not None:
+            postings = trigram_index.get(domain, {})
+            shared = Counter()
+            for trigram in name_trigrams(broken_ref):
+                shared.update(postings.get(trigram, ()))
+            candidates = [e for e, count in shared.items() if count >= 2]
+            if candidates:
+                suggestions = difflib.get_close_matches(
+                    broken_ref, candidates, n=3, cutoff=0.6
+                )
+
+        if not suggestions:
+            suggestions = difflib.get_close_matches(
+                broken_ref, same_domain_entities, n=3, cutoff=0.6
+            )
 
     # Deduplicate while preserving order
     seen = set()
@@ -305,6 +830,47 @@ def suggest_fix(broken_ref: str, valid_entities: Set[str]) -> List[str]:
     return unique_suggestions
 
 
+class EntityIndex:
+    """
+    Lookups over a set of valid entity IDs, built once per run so repeated
+    suggest_fix calls don't re-scan the entities. Suggestions are memoized
+    per reference, since the same broken reference often appears many times.
+    """
+
+    def __init__(self, valid_entities: Set[str]):
+        self.valid_entities = valid_entities
+        self._suggestions: Dict[str, List[str]] = {}
+
+    # The indexes are built on first use, so a fix run with nothing to
+    # suggest (or only memoized references) never pays for them
+
+    @functools.cached_property
+    def domain_index(self) -> Dict[str, List[str]]:
+        return build_domain_index(self.valid_entities)
+
+    @functools.cached_property
+    def normalized_index(self) -> Dict[str, str]:
+        return build_normalized_index(self.valid_entities)
+
+    @functools.cached_property
+    def trigram_index(self) -> Dict[str, Dict[str, List[str]]]:
+        return build_trigram_index(self.valid_entities)
+
+    def suggest_fix(self, broken_ref: str) -> List[str]:
+        """
+        Same as the module-level suggest_fix, using the prebuilt indexes.
+        """
+        if broken_ref not in self._suggestions:
+            self._suggestions[broken_ref] = suggest_fix(
+                broken_ref,
+                self.valid_entities,
+                self.domain_index,
+                self.normalized_index,
+                self.trigram_index,
+            )
+        return list(self._suggestions[broken_ref])
+
+
 def save_automation_config(automation_config: Dict[str, Any]) -> bool:
     """
     Saves an automation configuration to Home Assistant via the HTTP API.
@@ -315,14 +881,12 @@ def save_automation_config(automation_config: Dict[str, Any]) -> bool:
         return False
 
     url = f"http{TLS_S}://{config.HOST}/api/config/automation/config/{automation_id}"
-    headers = {
-        "Authorization": f"Bearer {config.ACCESS_TOKEN}",
-        "Content-Type": "application/json",
-    }
 
     try:
-        response = requests.post(
-            url, headers=headers, json=automation_config, verify=config.SSL_VERIFY
+        response = get_http_session().post(
+            url,
+            data=orjson.dumps(automation_config),
+            verify=config.SSL_VERIFY,
         )
         if response.status_code == 200:
             return True
@@ -334,43 +898,183 @@ def save_automation_config(automation_config: Dict[str, Any]) -> bool:
         return False
 
 
+@functools.lru_cache(maxsize=256)
+def _references_pattern(old_refs: Tuple[str, ...]) -> "re.Pattern[str]":
+    """
+    Compiles (and caches) a regex matching any of old_refs as a whole reference:
+    followed by a non-identifier char or end of string.
+    """
+    # Longest first so a ref never shadows a longer ref it prefixes
+    alternation = "|".join(
+        re.escape(r) for r in sorted(old_refs, key=len, reverse=True)
+    )
+    return re.compile(f"(?:{alternation})(?![a-z0-9_.-])", re.IGNORECASE)
+
+
+def iter_config_strings(data: Any) -> Iterator[str]:
+    """
+    Yields every string in a config object (dict or list) in document order,
+    including dict keys (e.g. entity IDs used as keys in scene data).
+    """
+    # A stack of iterators walks the tree without recursion while keeping
+    # document order. Dict items arrive as (key, value) tuples; configs come
+    # from JSON, so no other tuples occur and exact type checks are safe.
+    stack = [iter((data,))]
+    while stack:
+        for node in stack[-1]:
+            if type(node) is tuple:
+                key, node = node
+                if type(key) is str:
+                    yield key
+            node_type = type(node)
+            if node_type is str:
+                yield node
+            elif node_type is dict:
+                stack.append(iter(node.items()))
+                break
+            elif node_type is list:
+                stack.append(iter(node))
+                break
+        else:
+            stack.pop()
+
+
+def scan_config_references(
+    config_data: Union[Dict, List], valid_set: Set[str], source_id: str
+) -> List[str]:
+    """
+    Scans an automation/script config for strings that look like entity IDs
+    or service calls ("domain.name") and are not in valid_set.
+    Skips the config's own ID and common false positives.
+    Returns the potentially broken references in the order found, each once.
+    """
+    # Local bindings keep attribute lookups out of the per-string loop
+    fullmatch = ENTITY_ID_VALUE_RE.fullmatch
+    # The config's own ID (self reference in the id field), common false
+    # positives and ignored references, merged for a single lookup
+    skip = COMMON_FALSE_POSITIVES.union(IGNORED_REFERENCES, (source_id,))
+
+    # Walking the strings directly beats serializing the config and running
+    # a regex over the bytes: fullmatch gives up on the first character that
+    # can't be part of an ID, while a scan has to visit every byte of long
+    # templates and messages.
+    # Deduplicate in document order, then drop valid references and the
+    # skipped ones with one C-level set difference, so the regex and prefix
+    # checks only see each unknown string once.
+    candidates = dict.fromkeys(iter_config_strings(config_data))
+    unknown = candidates.keys() - valid_set - skip
+    broken = {
+        match
+        for match in unknown
+        if "." in match and fullmatch(match)
+        # Options might look like IDs? No, usually not dot separated unless value is an ID.
+        and not match.startswith("input_select.")
+    }
+    if not broken:
+        return []
+    return [match for match in candidates if match in broken]
+
+
+def scan_configs(
+    replies: Iterator[Tuple[str, Optional[Dict[str, Any]]]],
+    source_ids: List[str],
+    valid_set: Set[str],
+    verbose: bool = False,
+) -> Tuple[List[BrokenRef], List[BrokenRef]]:
+    """
+    Scans automation/script configs from an iter_*_configs iterator as they
+    arrive, classifying broken references as likely entities or services.
+    Returns the missing entity and missing service references in source_ids
+    order (each source's references in the order found).
+    """
+    missing_entities = []
+    missing_services = []
+    for source_id, config_data in replies:
+        if not config_data:
+            if verbose:
+                print(f"Skipping {source_id}: Could not fetch config.")
+            continue
+
+        for match in scan_config_references(config_data, valid_set, source_id):
+            if is_likely_service(match):
+                missing_services.append(BrokenRef(source_id, match))
+            else:
+                missing_entities.append(BrokenRef(source_id, match))
+            if verbose:
+                print(f"  {source_id}: Potential broken reference '{match}'")
+
+    # Replies arrive out of order
+    order = {source_id: i for i, source_id in enumerate(source_ids)}
+    missing_entities.sort(key=lambda ref: order[ref.source])
+    missing_services.sort(key=lambda ref: order[ref.source])
+    return missing_entities, missing_services
+
+
 def replace_references(data: Union[Dict, List], old_ref: str, new_ref: str) -> bool:
     """
     Recursively replace references in a config object (dict or list).
     Handles exact matches and substrings (e.g. in templates) using word boundaries.
     Returns True if any modification was made.
     """
-    modified = False
+    return bool(replace_references_many(data, {old_ref: new_ref}))
 
-    # Regex for safe replacement: old_ref followed by non-identifier char or end of string
-    # We assume old_ref is a valid entity_id (domain.name).
-    pattern = re.compile(re.escape(old_ref) + r"(?![a-z0-9_.-])", re.IGNORECASE)
-
-    if isinstance(data, dict):
-        for key, value in data.items():
-            if isinstance(value, str):
-                if pattern.search(value):
-                    new_value = pattern.sub(new_ref, value)
-                    if new_value != value:
-                        data[key] = new_value
-                        modified = True
-            elif isinstance(value, (dict, list)):
-                if replace_references(value, old_ref, new_ref):
-                    modified = True
 
-    elif isinstance(data, list):
-        for i, item in enumerate(data):
-            if isinstance(item, str):
-                if pattern.search(item):
-                    new_value = pattern.sub(new_ref, item)
-                    if new_value != item:
-                        data[i] = new_value
-                        modified = True
-            elif isinstance(item, (dict, list)):
-                if replace_references(item, old_ref, new_ref):
+def replace_references_many(
+    data: Union[Dict, List], replacements: Dict[str, str]
+) -> Set[str]:
+    """
+    Recursively replace several references in a config object in a single pass.
+    replacements maps each old reference to its new reference; matching is
+    case-insensitive, like replace_references.
+    Returns the set of old references that were replaced (empty if unmodified).
+    """
+    # We assume each old reference is a valid entity_id (domain.name).
+    lookup = {old.lower(): (old, new) for old, new in replacements.items()}
+    if not lookup:
+        return set()
+    needles = tuple(lookup)
+    pattern = _references_pattern(needles)
+    replaced = set()
+
+    def substitute(match: "re.Match[str]") -> str:
+        old, new = lookup[match.group(0).lower()]
+        replaced.add(old)
+        return new
+
+    def replace_string(value: str) -> str:
+        # Cheap substring prefilter: most strings contain none of the refs
+        lowered = value.lower()
+        if not any(needle in lowered for needle in needles):
+            return value
+        return pattern.sub(substitute, value)
+
+    # Iterative walk with an explicit stack: no recursion overhead or
+    # RecursionError on deeply nested configs. Configs come from JSON, so
+    # exact type checks are safe and cheaper than isinstance.
+    modified = False
+    stack = [data]
+    while stack:
+        node = stack.pop()
+        if type(node) is dict:
+            entries = node.items()
+        elif type(node) is list:
+            entries = enumerate(node)
+        else:
+            continue
+
+        for key, value in entries:
+            value_type = type(value)
+            if value_type is str:
+                new_value = replace_string(value)
+                if new_value != value:
+                    node[key] = new_value
                     modified = True
+            elif value_type is dict or value_type is list:
+                stack.append(value)
 
-    return modified
+    if not modified:
+        return set()
+    return replaced
 
 
 def get_device_registry(
@@ -380,11 +1084,15 @@ def get_device_registry(
     Fetches the device registry.
     Returns a dictionary of devices indexed by ID, and the updated msg_id.
     """
-    msg_id += 1
-    ws.send(json.dumps({"id": msg_id, "type": "config/device_registry/list"}))
-    result = ws.recv()
-    result = json.loads(result)
+    result, msg_id = ws_request(ws, {"type": "config/device_registry/list"}, msg_id)
+    return devices_from_result(result), msg_id
 
+
+def devices_from_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Builds the device dictionary indexed by ID from a
+    config/device_registry/list reply, for callers that batch the request.
+    """
     devices = {}
     if result["success"]:
         for d in result["result"]:
@@ -392,7 +1100,26 @@ def get_device_registry(
     else:
         print("Failed to list devices.")
 
-    return devices, msg_id
+    return devices
+
+
+def list_entity_registry(
+    ws: websocket.WebSocket, msg_id: int
+) -> Tuple[Dict[str, Any], int]:
+    """
+    Fetches the whole entity registry in one request.
+    Returns a dictionary of registry entries indexed by entity ID, and the updated msg_id.
+    """
+    result, msg_id = ws_request(ws, {"type": "config/entity_registry/list"}, msg_id)
+
+    entries = {}
+    if result["success"]:
+        for e in result["result"]:
+            entries[e["entity_id"]] = e
+    else:
+        print("Failed to list entity registry.")
+
+    return entries, msg_id
 
 
 def find_related_automations(
@@ -402,9 +1129,38 @@ def find_related_automations(
     Finds automations related to a given entity ID.
     Returns a list of automation entity IDs and the updated msg_id.
     """
-    msg_id += 1
-    ws.send(
-        json.dumps(
+    result, msg_id = ws_request(
+        ws,
+        {
+            "type": "search/related",
+            "item_type": "entity",
+            "item_id": entity_id,
+        },
+        msg_id,
+    )
+
+    automations = []
+    if result["success"]:
+        if "automation" in result["result"]:
+            automations = result["result"]["automation"]
+
+    return automations, msg_id
+
+
+def find_related_automations_many(
+    ws: websocket.WebSocket, entity_ids: List[str], msg_id: int
+) -> Tuple[Dict[str, List[str]], int]:
+    """
+    Finds automations related to several entity IDs in one pipelined batch.
+    Returns a dictionary of automation entity ID lists indexed by entity ID,
+    and the updated msg_id.
+    """
+    payloads = []
+    ids = {}
+    for entity_id in entity_ids:
+        msg_id += 1
+        ids[msg_id] = entity_id
+        payloads.append(
             {
                 "id": msg_id,
                 "type": "search/related",
@@ -412,16 +1168,13 @@ def find_related_automations(
                 "item_id": entity_id,
             }
         )
-    )
-    result = ws.recv()
-    result = json.loads(result)
 
-    automations = []
-    if result["success"]:
-        if "automation" in result["result"]:
-            automations = result["result"]["automation"]
+    related = {entity_id: [] for entity_id in entity_ids}
+    for reply_id, result in ws_batch(ws, payloads).items():
+        if result["success"] and "automation" in result["result"]:
+            related[ids[reply_id]] = result["result"]["automation"]
 
-    return automations, msg_id
+    return related, msg_id
 
 
 def get_automation_config(
@@ -431,18 +1184,14 @@ def get_automation_config(
     Fetches the configuration for a specific automation.
     Returns the config dict and the updated msg_id.
     """
-    msg_id += 1
-    ws.send(
-        json.dumps(
-            {
-                "id": msg_id,
-                "type": "automation/config",
-                "entity_id": automation_entity_id,
-            }
-        )
+    result, msg_id = ws_request(
+        ws,
+        {
+            "type": "automation/config",
+            "entity_id": automation_entity_id,
+        },
+        msg_id,
     )
-    result = ws.recv()
-    result = json.loads(result)
 
     if result["success"]:
         # The automation config is sometimes wrapped in a "config" key
@@ -452,25 +1201,134 @@ def get_automation_config(
     return None, msg_id
 
 
+def get_automation_configs(
+    ws: websocket.WebSocket,
+    automation_entity_ids: List[str],
+    msg_id: int,
+    state_versions: Optional[Dict[str, str]] = None,
+    cache: Optional["ConfigCache"] = None,
+) -> Tuple[Dict[str, Optional[Dict[str, Any]]], int]:
+    """
+    Fetches the configurations for several automations in one pipelined batch.
+    With a cache and state_versions (from get_valid_entities), configs whose
+    automation state is unchanged since the last run are read from the cache.
+    Returns a dictionary of configs (None if unavailable) indexed by automation
+    entity ID, and the updated msg_id.
+    """
+    return _get_configs(
+        ws, "automation/config", automation_entity_ids, msg_id, state_versions, cache
+    )
+
+
+def iter_automation_configs(
+    ws: websocket.WebSocket,
+    automation_entity_ids: List[str],
+    msg_id: int,
+    state_versions: Optional[Dict[str, str]] = None,
+    cache: Optional["ConfigCache"] = None,
+) -> Tuple[Iterator[Tuple[str, Optional[Dict[str, Any]]]], int]:
+    """
+    Same as get_automation_configs, but returns an iterator of
+    (automation entity ID, config) pairs in arrival order, so each config can
+    be processed while later ones are still in flight. Cached configs come
+    first. The cache must stay open until the iterator is exhausted.
+    Returns the iterator and the updated msg_id.
+    """
+    return _iter_configs(
+        ws, "automation/config", automation_entity_ids, msg_id, state_versions, cache
+    )
+
+
+def _get_configs(
+    ws: websocket.WebSocket,
+    request_type: str,
+    entity_ids: List[str],
+    msg_id: int,
+    state_versions: Optional[Dict[str, str]],
+    cache: Optional["ConfigCache"],
+) -> Tuple[Dict[str, Optional[Dict[str, Any]]], int]:
+    """
+    Shared implementation of get_automation_configs and get_script_configs.
+    request_type is the websocket command, e.g. "automation/config".
+    """
+    replies, msg_id = _iter_configs(
+        ws, request_type, entity_ids, msg_id, state_versions, cache
+    )
+    return dict(replies), msg_id
+
+
+def _iter_configs(
+    ws: websocket.WebSocket,
+    request_type: str,
+    entity_ids: List[str],
+    msg_id: int,
+    state_versions: Optional[Dict[str, str]],
+    cache: Optional["ConfigCache"],
+) -> Tuple[Iterator[Tuple[str, Optional[Dict[str, Any]]]], int]:
+    """
+    Shared implementation of the iter_*_configs functions. Message ids are
+    assigned up front so the updated msg_id is known before iterating.
+    """
+    cached = []
+    payloads = []
+    ids = {}
+    for entity_id in entity_ids:
+        version = state_versions.get(entity_id) if state_versions else None
+        if cache is not None and version:
+            config_data = cache.get(entity_id, version)
+            if config_data is not None:
+                cached.append((entity_id, config_data))
+                continue
+
+        msg_id += 1
+        ids[msg_id] = entity_id
+        payloads.append({"id": msg_id, "type": request_type, "entity_id": entity_id})
+
+    def replies() -> Iterator[Tuple[str, Optional[Dict[str, Any]]]]:
+        yield from cached
+        for reply_id, result in ws_batch_iter(ws, payloads):
+            entity_id = ids[reply_id]
+            config_data = None
+            if result["success"]:
+                # The config is sometimes wrapped in a "config" key
+                config_data = result["result"].get("config", result["result"])
+                version = state_versions.get(entity_id) if state_versions else None
+                if cache is not None and version:
+                    cache.set(entity_id, version, config_data)
+            yield entity_id, config_data
+
+    return replies(), msg_id
+
+
 def get_valid_services(ws: websocket.WebSocket, msg_id: int) -> Tuple[Set[str], int]:
     """
     Fetches all valid services.
+    Uses the registry snapshot or a fresh on-disk cache instead when available.
     Returns a set of service IDs (domain.service) and the updated msg_id.
     """
-    msg_id += 1
-    ws.send(json.dumps({"id": msg_id, "type": "get_services"}))
-    result = ws.recv()
-    result = json.loads(result)
+    cached = load_registry_snapshot() or read_registry_cache("services")
+    if cached:
+        return set(cached["services"]), msg_id
+
+    result, msg_id = ws_request(ws, {"type": "get_services"}, msg_id)
+    return _valid_services_from_result(result), msg_id
+
 
+def _valid_services_from_result(result: Dict[str, Any]) -> Set[str]:
+    """
+    Builds the service set from a get_services reply and caches it on disk.
+    """
     if not result["success"]:
         print("Failed to list services.")
-        return set(), msg_id
+        return set()
 
     services = set()
     for domain, domain_services in result["result"].items():
         for service in domain_services:
             services.add(f"{domain}.{service}")
-    return services, msg_id
+
+    write_registry_cache("services", {"services": sorted(services)})
+    return services
 
 
 def list_dashboards(
@@ -480,10 +1338,7 @@ def list_dashboards(
     Lists all Lovelace dashboards.
     Returns a list of dashboard objects and the updated msg_id.
     """
-    msg_id += 1
-    ws.send(json.dumps({"id": msg_id, "type": "lovelace/dashboards/list"}))
-    result = ws.recv()
-    result = json.loads(result)
+    result, msg_id = ws_request(ws, {"type": "lovelace/dashboards/list"}, msg_id)
 
     dashboards = []
     if result["success"]:
@@ -500,20 +1355,56 @@ def get_dashboard_config(
     If url_path is None, fetches the default dashboard.
     Returns the config dict and the updated msg_id.
     """
-    msg_id += 1
-    payload = {"id": msg_id, "type": "lovelace/config"}
+    payload = {"type": "lovelace/config"}
     if url_path:
         payload["url_path"] = url_path
 
-    ws.send(json.dumps(payload))
-    result = ws.recv()
-    result = json.loads(result)
+    result, msg_id = ws_request(ws, payload, msg_id)
 
     if result["success"]:
         return result["result"], msg_id
     return None, msg_id
 
 
+def get_dashboard_configs(
+    ws: websocket.WebSocket, url_paths: List[Optional[str]], msg_id: int
+) -> Tuple[Dict[Optional[str], Optional[Dict[str, Any]]], int]:
+    """
+    Fetches the configurations for several dashboards in one pipelined batch.
+    A url_path of None fetches the default dashboard.
+    Returns a dictionary of configs (None if unavailable) indexed by url_path,
+    and the updated msg_id.
+    """
+    replies, msg_id = iter_dashboard_configs(ws, url_paths, msg_id)
+    return dict(replies), msg_id
+
+
+def iter_dashboard_configs(
+    ws: websocket.WebSocket, url_paths: List[Optional[str]], msg_id: int
+) -> Tuple[Iterator[Tuple[Optional[str], Optional[Dict[str, Any]]]], int]:
+    """
+    Same as get_dashboard_configs, but returns an iterator of
+    (url_path, config) pairs in arrival order, so each config can be scanned
+    and dropped before the next one is decoded.
+    Returns the iterator and the updated msg_id.
+    """
+    payloads = []
+    ids = {}
+    for url_path in url_paths:
+        msg_id += 1
+        ids[msg_id] = url_path
+        payload = {"id": msg_id, "type": "lovelace/config"}
+        if url_path:
+            payload["url_path"] = url_path
+        payloads.append(payload)
+
+    def replies() -> Iterator[Tuple[Optional[str], Optional[Dict[str, Any]]]]:
+        for reply_id, result in ws_batch_iter(ws, payloads):
+            yield ids[reply_id], result["result"] if result["success"] else None
+
+    return replies(), msg_id
+
+
 def save_dashboard_config(
     ws: websocket.WebSocket,
     url_path: Optional[str],
@@ -524,14 +1415,11 @@ def save_dashboard_config(
     Saves the configuration for a specific dashboard.
     Returns True if successful, and the updated msg_id.
     """
-    msg_id += 1
-    payload = {"id": msg_id, "type": "lovelace/config/save", "config": config_data}
+    payload = {"type": "lovelace/config/save", "config": config_data}
     if url_path:
         payload["url_path"] = url_path
 
-    ws.send(json.dumps(payload))
-    result = ws.recv()
-    result = json.loads(result)
+    result, msg_id = ws_request(ws, payload, msg_id)
 
     return result["success"], msg_id
 
@@ -543,14 +1431,9 @@ def get_registry_entry(
     Fetches the entity registry entry for a specific entity.
     Returns the entry dict and the updated msg_id.
     """
-    msg_id += 1
-    ws.send(
-        json.dumps(
-            {"id": msg_id, "type": "config/entity_registry/get", "entity_id": entity_id}
-        )
+    result, msg_id = ws_request(
+        ws, {"type": "config/entity_registry/get", "entity_id": entity_id}, msg_id
     )
-    result = ws.recv()
-    result = json.loads(result)
 
     if result["success"]:
         return result["result"], msg_id
@@ -564,19 +1447,15 @@ def update_config_entry_options(
     Updates the options of a config entry.
     Returns True if successful, and the updated msg_id.
     """
-    msg_id += 1
-    ws.send(
-        json.dumps(
-            {
-                "id": msg_id,
-                "type": "config_entries/update",
-                "entry_id": entry_id,
-                "options": options,
-            }
-        )
+    result, msg_id = ws_request(
+        ws,
+        {
+            "type": "config_entries/update",
+            "entry_id": entry_id,
+            "options": options,
+        },
+        msg_id,
     )
-    result = ws.recv()
-    result = json.loads(result)
 
     if not result["success"]:
         print(f"Failed to update config entry {entry_id}: {result.get('error')}")
@@ -591,18 +1470,14 @@ def get_script_config(
     Fetches the configuration for a specific script.
     Returns the config dict and the updated msg_id.
     """
-    msg_id += 1
-    ws.send(
-        json.dumps(
-            {
-                "id": msg_id,
-                "type": "script/config",
-                "entity_id": script_entity_id,
-            }
-        )
+    result, msg_id = ws_request(
+        ws,
+        {
+            "type": "script/config",
+            "entity_id": script_entity_id,
+        },
+        msg_id,
     )
-    result = ws.recv()
-    result = json.loads(result)
 
     if result["success"]:
         if "config" in result["result"]:
@@ -611,6 +1486,39 @@ def get_script_config(
     return None, msg_id
 
 
+def get_script_configs(
+    ws: websocket.WebSocket,
+    script_entity_ids: List[str],
+    msg_id: int,
+    state_versions: Optional[Dict[str, str]] = None,
+    cache: Optional["ConfigCache"] = None,
+) -> Tuple[Dict[str, Optional[Dict[str, Any]]], int]:
+    """
+    Fetches the configurations for several scripts in one pipelined batch.
+    Caching works as in get_automation_configs.
+    Returns a dictionary of configs (None if unavailable) indexed by script
+    entity ID, and the updated msg_id.
+    """
+    return _get_configs(
+        ws, "script/config", script_entity_ids, msg_id, state_versions, cache
+    )
+
+
+def iter_script_configs(
+    ws: websocket.WebSocket,
+    script_entity_ids: List[str],
+    msg_id: int,
+    state_versions: Optional[Dict[str, str]] = None,
+    cache: Optional["ConfigCache"] = None,
+) -> Tuple[Iterator[Tuple[str, Optional[Dict[str, Any]]]], int]:
+    """
+    Same as iter_automation_configs, for scripts.
+    """
+    return _iter_configs(
+        ws, "script/config", script_entity_ids, msg_id, state_versions, cache
+    )
+
+
 def save_script_config(script_config: Dict[str, Any]) -> bool:
     """
     Saves a script configuration to Home Assistant via the HTTP API.
@@ -629,14 +1537,12 @@ def save_script_config(script_config: Dict[str, Any]) -> bool:
         return False
 
     url = f"http{TLS_S}://{config.HOST}/api/config/script/config/{script_id}"
-    headers = {
-        "Authorization": f"Bearer {config.ACCESS_TOKEN}",
-        "Content-Type": "application/json",
-    }
 
     try:
-        response = requests.post(
-            url, headers=headers, json=script_config, verify=config.SSL_VERIFY
+        response = get_http_session().post(
+            url,
+            data=orjson.dumps(script_config),
+            verify=config.SSL_VERIFY,
         )
         if response.status_code == 200:
             return True
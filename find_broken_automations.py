@@ -2,8 +2,7 @@
 # PYTHON_ARGCOMPLETE_OK
 
 import argparse
-import json
-import re
+import contextlib
 import tabulate
 import common
 import argcomplete
@@ -11,23 +10,10 @@ import argcomplete
 tabulate.PRESERVE_WHITESPACE = True
 
 
-def get_automation_id(ws, entity_id, msg_id):
-    msg_id += 1
-    ws.send(
-        json.dumps(
-            {"id": msg_id, "type": "config/entity_registry/get", "entity_id": entity_id}
-        )
-    )
-    result = ws.recv()
-    result = json.loads(result)
-
-    if result["success"]:
-        # The 'unique_id' in the registry is often the automation ID used for config
-        return result["result"]["unique_id"], msg_id
-    return None, msg_id
-
-
 def apply_fix(ws, automation_entity_id, old_ref, new_ref, msg_id):
+    # Always fetch the current config right before saving: the scanned copy
+    # may come from the config cache or predate edits made since, and saving
+    # it would overwrite them
     config_data, msg_id = common.get_automation_config(ws, automation_entity_id, msg_id)
     if not config_data:
         print(f"Could not fetch config for {automation_entity_id}")
@@ -36,9 +22,12 @@ def apply_fix(ws, automation_entity_id, old_ref, new_ref, msg_id):
     # Ensure ID is present
     if "id" not in config_data:
         # Try to fetch the ID from the registry
-        unique_id, msg_id = get_automation_id(ws, automation_entity_id, msg_id)
-        if unique_id:
-            config_data["id"] = unique_id
+        # The 'unique_id' in the registry is often the automation ID used for config
+        registry_entry, msg_id = common.get_registry_entry(
+            ws, automation_entity_id, msg_id
+        )
+        if registry_entry and registry_entry.get("unique_id"):
+            config_data["id"] = registry_entry["unique_id"]
         else:
             print(
                 f"  Could not determine ID for {automation_entity_id}. Skipping save."
@@ -49,6 +38,8 @@ def apply_fix(ws, automation_entity_id, old_ref, new_ref, msg_id):
     if common.replace_references(config_data, old_ref, new_ref):
         if common.save_automation_config(config_data):
             print(f"  Successfully updated {automation_entity_id}")
+            common.clear_registry_cache()
+            common.discard_cached_config("automations", automation_entity_id)
         else:
             print(f"  Failed to save {automation_entity_id}")
     else:
@@ -59,72 +50,41 @@ def apply_fix(ws, automation_entity_id, old_ref, new_ref, msg_id):
     return msg_id
 
 
-def find_broken_references(ws, verbose=False, fix=False):
+def find_broken_references(ws, verbose=False, fix=False, use_cache=True):
     print("Fetching entities and services...")
     msg_id = 1
-    valid_entities, msg_id = common.get_valid_entities(ws, msg_id)
-    valid_services, msg_id = common.get_valid_services(ws, msg_id)
-
-    # Also include some common special values or domains that might appear
-    # e.g. 'homeassistant.turn_on' is a service, so it's covered.
-    # 'sun.sun' is an entity.
-
-    valid_set = valid_entities | valid_services
+    state_versions = {}
+    valid_entities, valid_services, msg_id = common.get_valid_entities_and_services(
+        ws, msg_id, state_versions
+    )
 
     print(f"Found {len(valid_entities)} entities and {len(valid_services)} services.")
 
     automations = [e for e in valid_entities if e.startswith("automation.")]
-    print(f"Scanning {len(automations)} automations for broken references...")
-
-    broken_refs = []
 
-    for auto_id in automations:
-        config_data, msg_id = common.get_automation_config(ws, auto_id, msg_id)
-        if not config_data:
-            if verbose:
-                print(f"Skipping {auto_id}: Could not fetch config.")
-            continue
-
-        config_str = json.dumps(config_data)
+    # Also include some common special values or domains that might appear
+    # e.g. 'homeassistant.turn_on' is a service, so it's covered.
+    # 'sun.sun' is an entity.
+    # The entity set is extended in place instead of copying both into a new
+    # set; valid_entities is not needed on its own after this point.
+    valid_set = valid_entities
+    valid_set |= valid_services
 
-        # Regex to find potential entity_ids or service calls
-        # Pattern: word.word (where word is alphanumeric + underscore)
-        # We exclude keys in JSON by ensuring it's not followed by ":" (roughly)
-        # But JSON keys are quoted. "key": "value".
-        # We want to find "value" that looks like "domain.name".
+    print(f"Scanning {len(automations)} automations for broken references...")
 
-        # Simple regex: matches "domain.name" inside quotes
-        matches = re.findall(
-            common.ENTITY_ID_IN_QUOTES_PATTERN, config_str, re.IGNORECASE
+    # Configs are cached between runs and re-fetched once the automation's
+    # state changes (e.g. after an edit triggers a reload)
+    with (
+        common.ConfigCache("automations") if use_cache else contextlib.nullcontext()
+    ) as cache:
+        replies, msg_id = common.iter_automation_configs(
+            ws, automations, msg_id, state_versions, cache
+        )
+        missing_entities, missing_services = common.scan_configs(
+            replies, automations, valid_set, verbose
         )
 
-        for match in matches:
-            # Filter out common false positives
-            if match == auto_id:
-                continue  # Self reference (id field)
-            if match in common.COMMON_FALSE_POSITIVES:
-                continue
-            if match.startswith("input_select."):
-                continue  # Options might look like IDs? No, usually not dot separated unless value is an ID.
-
-            if common.is_ignored(match):
-                continue
-
-            if match not in valid_set:
-                broken_refs.append((auto_id, match))
-                if verbose:
-                    print(f"  {auto_id}: Potential broken reference '{match}'")
-
-    if broken_refs:
-        missing_services = []
-        missing_entities = []
-
-        for auto_id, ref in broken_refs:
-            if common.is_likely_service(ref):
-                missing_services.append((auto_id, ref))
-            else:
-                missing_entities.append((auto_id, ref))
-
+    if missing_entities or missing_services:
         if missing_entities:
             print("\nPotential Missing Entities:")
             print(
@@ -147,8 +107,9 @@ def find_broken_references(ws, verbose=False, fix=False):
 
         if fix and missing_entities:
             print("\nAttempting to fix broken entity references...")
+            entity_index = common.EntityIndex(valid_set)
             for auto_id, broken_ref in missing_entities:
-                suggestions = common.suggest_fix(broken_ref, valid_set)
+                suggestions = entity_index.suggest_fix(broken_ref)
                 if suggestions:
                     print(f"\nFound potential fix for '{broken_ref}' in '{auto_id}':")
                     for i, suggestion in enumerate(suggestions, 1):
@@ -178,12 +139,22 @@ if __name__ == "__main__":
         action="store_true",
         help="Attempt to auto-fix broken references interactively",
     )
+    parser.add_argument(
+        "--no-cache",
+        dest="use_cache",
+        action="store_false",
+        help="Ignore cached entities, services and configs from previous runs",
+    )
     argcomplete.autocomplete(parser)
     args = parser.parse_args()
+    # Fixes write to Home Assistant, so they must see its current state: the
+    # registry cache is only trusted for report-only runs
+    if not args.use_cache or args.fix:
+        common.REGISTRY_CACHE_TTL = 0
 
     with common.websocket_context() as ws:
         if ws:
-            if find_broken_references(ws, args.verbose, args.fix):
+            if find_broken_references(ws, args.verbose, args.fix, args.use_cache):
                 import sys
 
                 sys.exit(1)
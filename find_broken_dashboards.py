@@ -2,36 +2,87 @@
 # PYTHON_ARGCOMPLETE_OK
 
 import argparse
-import json
-import re
 import tabulate
 import common
 import argcomplete
 
 tabulate.PRESERVE_WHITESPACE = True
 
-
-def find_entity_references(data, valid_entities):
-    """Recursively find all strings that look like entity IDs."""
-    refs = []
-
-    if isinstance(data, dict):
-        for key, value in data.items():
-            # Check if the value itself is a string that looks like an entity ID
-            if isinstance(value, str):
-                # Heuristic: domain.name, no spaces, lowercase
-                if re.match(common.ENTITY_ID_PATTERN, value):
-                    # Exclude known non-entities
-                    if value not in ["type", "icon", "name", "theme", "url_path"]:
-                        refs.append(value)
-
-            # Recurse
-            refs.extend(find_entity_references(value, valid_entities))
-
-    elif isinstance(data, list):
-        for item in data:
-            refs.extend(find_entity_references(item, valid_entities))
-
+# Config values that are never entity IDs
+NON_ENTITY_VALUES = frozenset({"type", "icon", "name", "theme", "url_path"})
+
+# Input helper domains; inputs are entities, so if they are missing they are broken
+INPUT_DOMAINS = frozenset(
+    {
+        "input_select",
+        "input_text",
+        "input_number",
+        "input_boolean",
+        "input_datetime",
+        "input_button",
+    }
+)
+
+# Standard entity domains
+STANDARD_DOMAINS = frozenset(
+    {
+        "sensor",
+        "binary_sensor",
+        "switch",
+        "light",
+        "cover",
+        "media_player",
+        "climate",
+        "fan",
+        "lock",
+        "camera",
+        "weather",
+        "device_tracker",
+        "person",
+        "zone",
+        "sun",
+        "timer",
+        "counter",
+        "group",
+        "scene",
+        "script",
+        "automation",
+    }
+)
+
+ENTITY_DOMAINS = INPUT_DOMAINS | STANDARD_DOMAINS
+
+
+def find_entity_references(data):
+    """
+    Returns the set of dict values in a dashboard config that look like
+    entity IDs. Walks the config with an explicit stack instead of recursing,
+    deduplicating as it goes.
+    """
+    is_entity_id = common.ENTITY_ID_RE.match
+    refs = set()
+    add = refs.add
+    stack = [data]
+    pop = stack.pop
+    push = stack.append
+    while stack:
+        node = pop()
+        if type(node) is dict:
+            for value in node.values():
+                value_type = type(value)
+                # Check if the value itself is a string that looks like an entity ID
+                if value_type is str:
+                    # Heuristic: domain.name, no spaces, lowercase. Most values
+                    # (names, icons, card types) have no dot, and the substring
+                    # test rules them out far cheaper than the regex call.
+                    if "." in value and is_entity_id(value):
+                        # Exclude known non-entities
+                        if value not in NON_ENTITY_VALUES:
+                            add(value)
+                elif value_type is dict or value_type is list:
+                    push(value)
+        elif type(node) is list:
+            stack.extend(node)
     return refs
 
 
@@ -62,24 +113,39 @@ def find_broken_dashboards(ws, verbose=False, fix=False, target_dashboard=None):
 
     print(f"Scanning {len(dashboards)} dashboards...")
 
+    entity_index = common.EntityIndex(valid_entities) if fix else None
+
+    replies, msg_id = common.iter_dashboard_configs(
+        ws, [d.get("url_path") for d in dashboards], msg_id
+    )
+
+    # Scan each config as it arrives. Only the references are kept, plus the
+    # config itself when it may be fixed, so large dashboards are not all
+    # held in memory at once.
+    scanned = {}
+    for url_path, config_data in replies:
+        if not config_data:
+            scanned[url_path] = None
+            continue
+        # Find all potential entity references that are not valid entities;
+        # the set difference runs in C over the unique references
+        broken_refs = sorted(
+            find_entity_references(config_data).difference(valid_entities)
+        )
+        scanned[url_path] = (broken_refs, config_data if fix and broken_refs else None)
+
     found_issues = False
     for dashboard in dashboards:
         url_path = dashboard.get("url_path")
         title = dashboard.get("title", "Unknown")
 
-        config_data, msg_id = common.get_dashboard_config(ws, url_path, msg_id)
-        if not config_data:
+        if not scanned.get(url_path):
             if verbose:
                 print(
                     f"Skipping {title}: Could not fetch config (might be auto-generated)."
                 )
             continue
-
-        # Find all potential entity references
-        refs = find_entity_references(config_data, valid_entities)
-
-        # Filter for broken ones
-        broken_refs = sorted(list(set([r for r in refs if r not in valid_entities])))
+        broken_refs, config_data = scanned[url_path]
 
         # Filter out likely false positives (service calls, special keywords)
         # This is a bit heuristic.
@@ -88,43 +154,7 @@ def find_broken_dashboards(ws, verbose=False, fix=False, target_dashboard=None):
             if common.is_ignored(ref):
                 continue
 
-            domain = ref.split(".")[0]
-            if domain in [
-                "input_select",
-                "input_text",
-                "input_number",
-                "input_boolean",
-                "input_datetime",
-                "input_button",
-            ]:
-                # Inputs are entities, so if they are missing, they are broken.
-                pass
-            elif domain in [
-                "sensor",
-                "binary_sensor",
-                "switch",
-                "light",
-                "cover",
-                "media_player",
-                "climate",
-                "fan",
-                "lock",
-                "camera",
-                "weather",
-                "device_tracker",
-                "person",
-                "zone",
-                "sun",
-                "timer",
-                "counter",
-                "group",
-                "scene",
-                "script",
-                "automation",
-            ]:
-                # Standard domains
-                pass
-            else:
+            if ref.partition(".")[0] not in ENTITY_DOMAINS:
                 # Likely a service call or other config value (e.g. 'custom:button-card')
                 if verbose:
                     print(f"  Ignoring likely non-entity: {ref}")
@@ -145,8 +175,11 @@ def find_broken_dashboards(ws, verbose=False, fix=False, target_dashboard=None):
             )
 
             if fix:
+                # Collect the accepted fixes and apply them in one pass, so the
+                # dashboard is saved once rather than once per fix
+                fixes = {}
                 for broken_ref in filtered_broken_refs:
-                    suggestions = common.suggest_fix(broken_ref, valid_entities)
+                    suggestions = entity_index.suggest_fix(broken_ref)
                     if suggestions:
                         print(f"\nFound potential fix for '{broken_ref}':")
                         for i, suggestion in enumerate(suggestions, 1):
@@ -154,27 +187,26 @@ def find_broken_dashboards(ws, verbose=False, fix=False, target_dashboard=None):
 
                         answer = common.prompt_apply_fix(len(suggestions))
                         if answer.isdigit() and 1 <= int(answer) <= len(suggestions):
-                            selected_fix = suggestions[int(answer) - 1]
-
-                            if common.replace_references(
-                                config_data, broken_ref, selected_fix
-                            ):
-                                print(f"  Updated config in memory.")
-                                # Save immediately? Or batch?
-                                # Let's save immediately to be safe.
-                                success, msg_id = common.save_dashboard_config(
-                                    ws, url_path, config_data, msg_id
-                                )
-                                if success:
-                                    print("  Successfully saved dashboard config.")
-                                else:
-                                    print("  Failed to save dashboard config.")
-                            else:
-                                print(
-                                    "  Could not find reference in config structure (weird)."
-                                )
+                            fixes[broken_ref] = suggestions[int(answer) - 1]
                         else:
                             print("  Skipped.")
+
+                if fixes:
+                    replaced = common.replace_references_many(config_data, fixes)
+                    for broken_ref in fixes:
+                        if broken_ref not in replaced:
+                            print(
+                                f"  Could not find {broken_ref} in config structure (weird)."
+                            )
+                    if replaced:
+                        print(f"  Updated {len(replaced)} reference(s) in memory.")
+                        success, msg_id = common.save_dashboard_config(
+                            ws, url_path, config_data, msg_id
+                        )
+                        if success:
+                            print("  Successfully saved dashboard config.")
+                        else:
+                            print("  Failed to save dashboard config.")
         elif verbose:
             print(f"No broken references found in '{title}'.")
 
@@ -196,8 +228,18 @@ if __name__ == "__main__":
         action="store_true",
         help="Attempt to auto-fix broken references interactively",
     )
+    parser.add_argument(
+        "--no-cache",
+        dest="use_cache",
+        action="store_false",
+        help="Ignore cached entities and services from previous runs",
+    )
     argcomplete.autocomplete(parser)
     args = parser.parse_args()
+    # Fixes write to Home Assistant, so they must see its current state: the
+    # registry cache is only trusted for report-only runs
+    if not args.use_cache or args.fix:
+        common.REGISTRY_CACHE_TTL = 0
 
     with common.websocket_context() as ws:
         if ws:
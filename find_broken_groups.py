@@ -2,7 +2,6 @@
 # PYTHON_ARGCOMPLETE_OK
 
 import argparse
-import json
 import tabulate
 import common
 import argcomplete
@@ -11,10 +10,7 @@ tabulate.PRESERVE_WHITESPACE = True
 
 
 def get_all_states(ws, msg_id):
-    msg_id += 1
-    ws.send(json.dumps({"id": msg_id, "type": "get_states"}))
-    result = ws.recv()
-    result = json.loads(result)
+    result, msg_id = common.ws_request(ws, {"type": "get_states"}, msg_id)
     if result["success"]:
         return result["result"], msg_id
     return [], msg_id
@@ -22,20 +18,16 @@ def get_all_states(ws, msg_id):
 
 def update_group(ws, object_id, members, msg_id):
     # This only works for 'group' domain legacy groups
-    msg_id += 1
-    ws.send(
-        json.dumps(
-            {
-                "id": msg_id,
-                "type": "call_service",
-                "domain": "group",
-                "service": "set",
-                "service_data": {"object_id": object_id, "entities": members},
-            }
-        )
+    result, msg_id = common.ws_request(
+        ws,
+        {
+            "type": "call_service",
+            "domain": "group",
+            "service": "set",
+            "service_data": {"object_id": object_id, "entities": members},
+        },
+        msg_id,
     )
-    result = ws.recv()
-    result = json.loads(result)
     return result["success"], msg_id
 
 
@@ -62,6 +54,10 @@ def find_broken_groups(ws, verbose=False, fix=False):
         entity_id = group["entity_id"]
         members = group["attributes"]["entity_id"]
 
+        # Most groups are intact: one C-level subset check settles those,
+        # and only broken groups pay for the ordered per-member filter
+        if valid_entities.issuperset(members):
+            continue
         broken_members = [m for m in members if m not in valid_entities]
 
         if broken_members:
@@ -90,40 +86,35 @@ def find_broken_groups(ws, verbose=False, fix=False):
 
         if fix:
             print("\nAttempting to fix broken groups...")
+            entity_index = common.EntityIndex(valid_entities)
+            # The registry is listed on the first group that needs its config
+            # entry, so a run where nothing gets fixed never requests it
+            registry = None
             for bg in broken_groups:
                 entity_id = bg["entity_id"]
                 domain = entity_id.split(".")[0]
 
-                # Check if it's a config entry helper
-                registry_entry, msg_id = common.get_registry_entry(
-                    ws, entity_id, msg_id
-                )
-                config_entry_id = (
-                    registry_entry.get("config_entry_id") if registry_entry else None
-                )
-
-                if not config_entry_id and domain != "group":
-                    print(
-                        f"  Skipping {entity_id}: Auto-fix only supported for 'group' domain or Helper entities."
+                # Other domains can only be fixed as config entry helpers, so
+                # check those before prompting
+                config_entry_id = None
+                if domain != "group":
+                    if registry is None:
+                        registry, msg_id = common.list_entity_registry(ws, msg_id)
+                    config_entry_id = (registry.get(entity_id) or {}).get(
+                        "config_entry_id"
                     )
-                    continue
-
-                # Determine if we can fix it
-                can_fix = False
-                if domain == "group" and not config_entry_id:
-                    can_fix = True  # Legacy group
-                elif config_entry_id:
-                    can_fix = True  # Helper (attempt)
-
-                if not can_fix:
-                    print(f"  Skipping {entity_id}: Cannot determine how to update.")
-                    continue
+                    if not config_entry_id:
+                        print(
+                            f"  Skipping {entity_id}: Auto-fix only supported for 'group' domain or Helper entities."
+                        )
+                        continue
 
-                current_members = list(bg["members"])
-                modified = False
+                # Collect the choices first (None means delete), then rebuild
+                # the member list once instead of once per broken member
+                replacements = {}
 
                 for broken in bg["broken"]:
-                    suggestions = common.suggest_fix(broken, valid_entities)
+                    suggestions = entity_index.suggest_fix(broken)
                     if suggestions:
                         print(f"\nFound potential fix for '{broken}' in '{entity_id}':")
                         for i, suggestion in enumerate(suggestions, 1):
@@ -132,18 +123,10 @@ def find_broken_groups(ws, verbose=False, fix=False):
                         answer = common.prompt_apply_fix_with_delete(len(suggestions))
                         if answer.isdigit() and 1 <= int(answer) <= len(suggestions):
                             selected_fix = suggestions[int(answer) - 1]
-                            # Replace in list
-                            current_members = [
-                                selected_fix if m == broken else m
-                                for m in current_members
-                            ]
-                            modified = True
+                            replacements[broken] = selected_fix
                             print(f"  Replacing {broken} with {selected_fix}")
                         elif answer.lower() == "d":
-                            current_members = [
-                                m for m in current_members if m != broken
-                            ]
-                            modified = True
+                            replacements[broken] = None
                             print(f"  Removing {broken}")
                         else:
                             print("  Skipped.")
@@ -151,13 +134,26 @@ def find_broken_groups(ws, verbose=False, fix=False):
                         print(f"\nNo suggestions for '{broken}' in '{entity_id}'.")
                         answer = common.prompt_delete_member()
                         if answer.lower() == "y":
-                            current_members = [
-                                m for m in current_members if m != broken
-                            ]
-                            modified = True
+                            replacements[broken] = None
                             print(f"  Removing {broken}")
 
+                modified = bool(replacements)
+                current_members = [
+                    replacements.get(m, m)
+                    for m in bg["members"]
+                    if replacements.get(m, m) is not None
+                ]
+
                 if modified:
+                    if domain == "group":
+                        # A group can still be a helper, which is saved as a
+                        # config entry rather than through group.set
+                        if registry is None:
+                            registry, msg_id = common.list_entity_registry(ws, msg_id)
+                        config_entry_id = (registry.get(entity_id) or {}).get(
+                            "config_entry_id"
+                        )
+
                     if config_entry_id:
                         # Update config entry
                         # We assume the key is 'entities' for group-like helpers
@@ -200,8 +196,18 @@ if __name__ == "__main__":
         action="store_true",
         help="Attempt to auto-fix broken references interactively",
     )
+    parser.add_argument(
+        "--no-cache",
+        dest="use_cache",
+        action="store_false",
+        help="Ignore cached entities and services from previous runs",
+    )
     argcomplete.autocomplete(parser)
     args = parser.parse_args()
+    # Fixes write to Home Assistant, so they must see its current state: the
+    # registry cache is only trusted for report-only runs
+    if not args.use_cache or args.fix:
+        common.REGISTRY_CACHE_TTL = 0
 
     with common.websocket_context() as ws:
         if ws:
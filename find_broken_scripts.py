@@ -2,8 +2,7 @@
 # PYTHON_ARGCOMPLETE_OK
 
 import argparse
-import json
-import re
+import contextlib
 import tabulate
 import common
 import argcomplete
@@ -11,22 +10,10 @@ import argcomplete
 tabulate.PRESERVE_WHITESPACE = True
 
 
-def get_script_id(ws, entity_id, msg_id):
-    msg_id += 1
-    ws.send(
-        json.dumps(
-            {"id": msg_id, "type": "config/entity_registry/get", "entity_id": entity_id}
-        )
-    )
-    result = ws.recv()
-    result = json.loads(result)
-
-    if result["success"]:
-        return result["result"]["unique_id"], msg_id
-    return None, msg_id
-
-
 def apply_fix(ws, script_entity_id, old_ref, new_ref, msg_id):
+    # Always fetch the current config right before saving: the scanned copy
+    # may come from the config cache or predate edits made since, and saving
+    # it would overwrite them
     config_data, msg_id = common.get_script_config(ws, script_entity_id, msg_id)
     if not config_data:
         print(f"Could not fetch config for {script_entity_id}")
@@ -34,9 +21,9 @@ def apply_fix(ws, script_entity_id, old_ref, new_ref, msg_id):
 
     # Ensure ID is present for saving
     if "unique_id" not in config_data:
-        unique_id, msg_id = get_script_id(ws, script_entity_id, msg_id)
-        if unique_id:
-            config_data["unique_id"] = unique_id
+        registry_entry, msg_id = common.get_registry_entry(ws, script_entity_id, msg_id)
+        if registry_entry and registry_entry.get("unique_id"):
+            config_data["unique_id"] = registry_entry["unique_id"]
         else:
             print(
                 f"  Could not determine unique_id for {script_entity_id}. Skipping save."
@@ -47,6 +34,8 @@ def apply_fix(ws, script_entity_id, old_ref, new_ref, msg_id):
     if common.replace_references(config_data, old_ref, new_ref):
         if common.save_script_config(config_data):
             print(f"  Successfully updated {script_entity_id}")
+            common.clear_registry_cache()
+            common.discard_cached_config("scripts", script_entity_id)
         else:
             print(f"  Failed to save {script_entity_id}")
     else:
@@ -57,62 +46,38 @@ def apply_fix(ws, script_entity_id, old_ref, new_ref, msg_id):
     return msg_id
 
 
-def find_broken_references(ws, verbose=False, fix=False):
+def find_broken_references(ws, verbose=False, fix=False, use_cache=True):
     print("Fetching entities and services...")
     msg_id = 1
-    valid_entities, msg_id = common.get_valid_entities(ws, msg_id)
-    valid_services, msg_id = common.get_valid_services(ws, msg_id)
-
-    valid_set = valid_entities | valid_services
+    state_versions = {}
+    valid_entities, valid_services, msg_id = common.get_valid_entities_and_services(
+        ws, msg_id, state_versions
+    )
 
     print(f"Found {len(valid_entities)} entities and {len(valid_services)} services.")
 
     scripts = [e for e in valid_entities if e.startswith("script.")]
-    print(f"Scanning {len(scripts)} scripts for broken references...")
-
-    broken_refs = []
 
-    for script_id in scripts:
-        config_data, msg_id = common.get_script_config(ws, script_id, msg_id)
-        if not config_data:
-            if verbose:
-                print(f"Skipping {script_id}: Could not fetch config.")
-            continue
+    # Extend the entity set in place instead of copying both into a new set;
+    # valid_entities is not needed on its own after this point
+    valid_set = valid_entities
+    valid_set |= valid_services
 
-        config_str = json.dumps(config_data)
+    print(f"Scanning {len(scripts)} scripts for broken references...")
 
-        # Regex to find potential entity_ids or service calls
-        matches = re.findall(
-            common.ENTITY_ID_IN_QUOTES_PATTERN, config_str, re.IGNORECASE
+    # Configs are cached between runs and re-fetched once the script's
+    # state changes (e.g. after an edit triggers a reload)
+    with (
+        common.ConfigCache("scripts") if use_cache else contextlib.nullcontext()
+    ) as cache:
+        replies, msg_id = common.iter_script_configs(
+            ws, scripts, msg_id, state_versions, cache
+        )
+        missing_entities, missing_services = common.scan_configs(
+            replies, scripts, valid_set, verbose
         )
 
-        for match in matches:
-            # Filter out common false positives
-            if match == script_id:
-                continue
-            if match in common.COMMON_FALSE_POSITIVES:
-                continue
-            if match.startswith("input_select."):
-                continue
-
-            if common.is_ignored(match):
-                continue
-
-            if match not in valid_set:
-                broken_refs.append((script_id, match))
-                if verbose:
-                    print(f"  {script_id}: Potential broken reference '{match}'")
-
-    if broken_refs:
-        missing_services = []
-        missing_entities = []
-
-        for script_id, ref in broken_refs:
-            if common.is_likely_service(ref):
-                missing_services.append((script_id, ref))
-            else:
-                missing_entities.append((script_id, ref))
-
+    if missing_entities or missing_services:
         if missing_entities:
             print("\nPotential Missing Entities:")
             print(
@@ -135,8 +100,9 @@ def find_broken_references(ws, verbose=False, fix=False):
 
         if fix and missing_entities:
             print("\nAttempting to fix broken entity references...")
+            entity_index = common.EntityIndex(valid_set)
             for script_id, broken_ref in missing_entities:
-                suggestions = common.suggest_fix(broken_ref, valid_set)
+                suggestions = entity_index.suggest_fix(broken_ref)
                 if suggestions:
                     print(f"\nFound potential fix for '{broken_ref}' in '{script_id}':")
                     for i, suggestion in enumerate(suggestions, 1):
@@ -166,12 +132,22 @@ if __name__ == "__main__":
         action="store_true",
         help="Attempt to auto-fix broken references interactively",
     )
+    parser.add_argument(
+        "--no-cache",
+        dest="use_cache",
+        action="store_false",
+        help="Ignore cached entities, services and configs from previous runs",
+    )
     argcomplete.autocomplete(parser)
     args = parser.parse_args()
+    # Fixes write to Home Assistant, so they must see its current state: the
+    # registry cache is only trusted for report-only runs
+    if not args.use_cache or args.fix:
+        common.REGISTRY_CACHE_TTL = 0
 
     with common.websocket_context() as ws:
         if ws:
-            if find_broken_references(ws, args.verbose, args.fix):
+            if find_broken_references(ws, args.verbose, args.fix, args.use_cache):
                 import sys
 
                 sys.exit(1)
@@ -4,54 +4,43 @@
 import argparse
 import config
 import csv
-import json
+import orjson
 import re
-import requests
+from operator import itemgetter
 import tabulate
 import common
 import argcomplete
 
 tabulate.PRESERVE_WHITESPACE = True
 
-# Determine the protocol based on TLS configuration
-TLS_S = "s" if config.TLS else ""
-
-# Header containing the access token
-headers = {
-    "Authorization": f"Bearer {config.ACCESS_TOKEN}",
-    "Content-Type": "application/json",
-}
-
 
 def list_entities(regex=None):
     # API endpoint for retrieving all entities
-    api_endpoint = f"http{TLS_S}://{config.HOST}/api/states"
+    api_endpoint = f"http{common.TLS_S}://{config.HOST}/api/states"
 
     # Send GET request to the API endpoint
-    response = requests.get(api_endpoint, headers=headers, verify=config.SSL_VERIFY)
+    response = common.get_http_session().get(api_endpoint, verify=config.SSL_VERIFY)
 
     # Check if the request was successful
     if response.status_code == 200:
-        # Parse the JSON response
-        data = json.loads(response.text)
-
-        # Extract entity IDs and friendly names
+        # Parse the JSON response; the raw body is released right away so
+        # only the parsed states stay alive while filtering
+        data = orjson.loads(response.content)
+        del response
+
+        # Extract entity IDs and friendly names in one pass, filtering by
+        # entity ID first if regex argument is provided, so rejected entities
+        # never get a row built
+        search = common.entity_id_matcher(regex) if regex else None
         entity_data = [
             (entity["attributes"].get("friendly_name", ""), entity["entity_id"])
             for entity in data
+            if search is None or search(entity["entity_id"])
         ]
-
-        # Filter the entity data if regex argument is provided
-        if regex:
-            filtered_entity_data = [
-                (friendly_name, entity_id)
-                for friendly_name, entity_id in entity_data
-                if re.search(regex, entity_id)
-            ]
-            entity_data = filtered_entity_data
+        del data
 
         # Sort the entity data by friendly name
-        entity_data = sorted(entity_data, key=lambda x: x[0])
+        entity_data.sort(key=itemgetter(0))
 
         # Output the entity data
         return entity_data
@@ -64,8 +53,9 @@ def list_entities(regex=None):
 def process_entities(entity_data, search_regex, replace_regex=None, output_csv=None):
     rename_data = []
     if replace_regex is not None:
+        search_pattern = re.compile(search_regex)
         for friendly_name, entity_id in entity_data:
-            new_entity_id = re.sub(search_regex, replace_regex, entity_id)
+            new_entity_id = search_pattern.sub(replace_regex, entity_id)
             rename_data.append((friendly_name, entity_id, new_entity_id))
     else:
         rename_data = [
@@ -73,17 +63,16 @@ def process_entities(entity_data, search_regex, replace_regex=None, output_csv=N
         ]
 
     # Print the table with friendly name and entity ID
-    table = [
-        ("Friendly Name", "Current Entity ID", "New Entity ID")
-    ] + common.align_strings(rename_data)
-    print(tabulate.tabulate(table, headers="firstrow", tablefmt="github"))
+    headers = ["Friendly Name", "Current Entity ID", "New Entity ID"]
+    print(common.format_github_table(common.align_strings(rename_data), headers))
 
-    # Same table, but without whitespace for alignment
-    table = [("Friendly Name", "Current Entity ID", "New Entity ID")] + rename_data
+    # Same table, but without whitespace for alignment; the rows are written
+    # straight from rename_data rather than copied into a new table
     if output_csv:
         with open(output_csv, "w", newline="") as csvfile:
             csv_writer = csv.writer(csvfile)
-            csv_writer.writerows(table)
+            csv_writer.writerow(headers)
+            csv_writer.writerows(rename_data)
             print(f"(Table written to {output_csv})")
 
     # Ask user for confirmation if replace_regex is provided
@@ -103,11 +92,13 @@ def rename_entities(rename_data):
         if not ws:
             return
 
-        # Rename the entities
+        # Rename the entities, pipelining the requests so the whole batch
+        # costs about one round trip instead of one per entity
         msg_id = 1
-        for index, (_, entity_id, new_entity_id) in enumerate(rename_data, start=1):
+        payloads = []
+        for _, entity_id, new_entity_id in rename_data:
             msg_id += 1
-            entity_registry_update_msg = json.dumps(
+            payloads.append(
                 {
                     "id": msg_id,
                     "type": "config/entity_registry/update",
@@ -115,18 +106,29 @@ def rename_entities(rename_data):
                     "new_entity_id": new_entity_id,
                 }
             )
-            ws.send(entity_registry_update_msg)
-            update_result = ws.recv()
-            update_result = json.loads(update_result)
+        results = common.ws_batch(ws, payloads)
+
+        # All results are in, so report them with a single write instead of
+        # one print (and one terminal flush) per entity
+        lines = []
+        for payload in payloads:
+            entity_id = payload["entity_id"]
+            new_entity_id = payload["new_entity_id"]
+            update_result = results[payload["id"]]
             if update_result["success"]:
-                print(
+                lines.append(
                     f"Entity '{entity_id}' renamed to '{new_entity_id}' successfully!"
                 )
             else:
                 error_msg = update_result.get("error", {}).get(
                     "message", "Unknown error"
                 )
-                print(f"Failed to rename entity '{entity_id}': {error_msg}")
+                lines.append(f"Failed to rename entity '{entity_id}': {error_msg}")
+        if lines:
+            print("\n".join(lines))
+
+        # Entity IDs changed, so cached entity lists are stale
+        common.clear_registry_cache()
 
 
 if __name__ == "__main__":
@@ -1,8 +1,8 @@
 #!/usr/bin/env python3
 
-import json
 import tabulate
 from collections import defaultdict
+from operator import itemgetter
 import common
 
 tabulate.PRESERVE_WHITESPACE = True
@@ -15,9 +15,9 @@ def list_platforms():
 
         # List registry entries
         msg_id = 1
-        ws.send(json.dumps({"id": msg_id, "type": "config/entity_registry/list"}))
-        result = ws.recv()
-        result = json.loads(result)
+        result, msg_id = common.ws_request(
+            ws, {"type": "config/entity_registry/list"}, msg_id
+        )
 
         if result["success"]:
             entities = result["result"]
@@ -28,13 +28,15 @@ def list_platforms():
             for e in entities:
                 platform = e.get("platform")
                 platform_counts[platform] += 1
-                if len(platform_examples[platform]) < 3:
-                    platform_examples[platform].append(e["entity_id"])
+                # One lookup for the examples list, reused for check and append
+                examples = platform_examples[platform]
+                if len(examples) < 3:
+                    examples.append(e["entity_id"])
 
             # Prepare table
             table_data = []
             for platform, count in sorted(
-                platform_counts.items(), key=lambda item: item[1], reverse=True
+                platform_counts.items(), key=itemgetter(1), reverse=True
             ):
                 examples = ", ".join(platform_examples[platform])
                 table_data.append((platform, count, examples))
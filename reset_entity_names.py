@@ -2,32 +2,58 @@
 # PYTHON_ARGCOMPLETE_OK
 
 import argparse
-import json
-import re
 import tabulate
 import common
 import argcomplete
 
 tabulate.PRESERVE_WHITESPACE = True
 
+# Entity IDs per get_automatic_entity_ids request
+AUTOMATIC_IDS_CHUNK_SIZE = 500
+
+# Registry cache entry names and the requests that fetch them
+REGISTRY_REQUESTS = (
+    ("entity_registry", "config/entity_registry/list"),
+    ("device_registry", "config/device_registry/list"),
+)
+
 
 def list_entities(ws, search_regex=None):
-    msg_id = 1
-    ws.send(json.dumps({"id": msg_id, "type": "config/entity_registry/list"}))
-    result = ws.recv()
-    result = json.loads(result)
+    # The device registry is needed for the proposed names anyway, so fetch
+    # both registries in one pipelined round trip. Repeated dry runs (e.g.
+    # while refining --search) reuse recent replies from the registry cache;
+    # runs that write always fetch them live (see __main__)
+    results = {}
+    payloads = []
+    for msg_id, (name, request_type) in enumerate(REGISTRY_REQUESTS, 1):
+        cached = common.read_registry_cache(name)
+        if cached is None:
+            payloads.append({"id": msg_id, "type": request_type})
+        else:
+            results[msg_id] = cached
+    if payloads:
+        fetched = common.ws_batch(ws, payloads)
+        for msg_id, (name, _) in enumerate(REGISTRY_REQUESTS, 1):
+            if msg_id in fetched and fetched[msg_id]["success"]:
+                common.write_registry_cache(name, fetched[msg_id])
+        results.update(fetched)
+    result = results[1]
+    devices = common.devices_from_result(results[2])
 
     if not result["success"]:
         print("Failed to list entities.")
-        return []
+        return [], devices
 
     entities = result["result"]
 
-    # Filter out entities that don't belong to a device (e.g. helper groups)
-    entities = [e for e in entities if e.get("device_id")]
-
-    if search_regex:
-        entities = [e for e in entities if re.search(search_regex, e["entity_id"])]
+    # Filter out entities that don't belong to a device (e.g. helper groups),
+    # and by entity ID if a search regex is given, in a single pass
+    search = common.entity_id_matcher(search_regex) if search_regex else None
+    entities = [
+        e
+        for e in entities
+        if e.get("device_id") and (search is None or search(e["entity_id"]))
+    ]
 
     if not entities:
         print(
@@ -35,19 +61,23 @@ def list_entities(ws, search_regex=None):
             + (f" matching '{search_regex}'" if search_regex else "")
             + "."
         )
-        return []
+        return [], devices
 
-    return entities
+    return entities, devices
 
 
-def update_automation_references(ws, updates, msg_id, dry_run=False, verbose=False):
+def update_automation_references(
+    ws, updates, msg_id, dry_run=False, verbose=False, fetched_configs=None
+):
     print("\nChecking for automation references to update...")
 
     automation_updates = {}
 
+    related, msg_id = common.find_related_automations_many(
+        ws, [old_id for old_id, _ in updates], msg_id
+    )
     for old_id, new_id in updates:
-        automations, msg_id = common.find_related_automations(ws, old_id, msg_id)
-        for auto_id in automations:
+        for auto_id in related[old_id]:
             if auto_id not in automation_updates:
                 automation_updates[auto_id] = []
             automation_updates[auto_id].append((old_id, new_id))
@@ -58,18 +88,26 @@ def update_automation_references(ws, updates, msg_id, dry_run=False, verbose=Fal
 
     print(f"Found {len(automation_updates)} automations to update.")
 
+    # Configs fetched by an earlier pass are reused; they are kept in step
+    # with what was saved, so only automations not seen before are fetched
+    configs = {} if fetched_configs is None else fetched_configs
+    missing = [auto_id for auto_id in automation_updates if auto_id not in configs]
+    if missing:
+        fetched, msg_id = common.get_automation_configs(ws, missing, msg_id)
+        configs.update(fetched)
+
     for auto_entity_id, replacements in automation_updates.items():
-        config_data, msg_id = common.get_automation_config(ws, auto_entity_id, msg_id)
+        config_data = configs.get(auto_entity_id)
         if not config_data:
             print(f"Could not fetch config for {auto_entity_id}")
             continue
 
-        # Use common.replace_references for safe replacement
-        modified = False
-        for old_id, new_id in replacements:
-            if common.replace_references(config_data, old_id, new_id):
-                modified = True
-                if not dry_run:
+        # Use common.replace_references_many for safe single-pass replacement
+        replaced = common.replace_references_many(config_data, dict(replacements))
+        modified = bool(replaced)
+        if not dry_run:
+            for old_id, new_id in replacements:
+                if old_id in replaced:
                     print(
                         f"  Updating reference {old_id} -> {new_id} in {auto_entity_id}"
                     )
@@ -78,10 +116,14 @@ def update_automation_references(ws, updates, msg_id, dry_run=False, verbose=Fal
             if not dry_run:
                 if common.save_automation_config(config_data):
                     print(f"  Successfully saved automation {auto_entity_id}")
+                    common.discard_cached_config("automations", auto_entity_id)
                 else:
                     print(f"  Failed to save automation {auto_entity_id}")
+                    # The edited copy no longer matches Home Assistant's
+                    del configs[auto_entity_id]
             else:
                 print(f"  [Preview] Would update references in {auto_entity_id}")
+                del configs[auto_entity_id]
                 for old_id, new_id in replacements:
                     print(f"    - {old_id} -> {new_id}")
         else:
@@ -93,14 +135,23 @@ def update_automation_references(ws, updates, msg_id, dry_run=False, verbose=Fal
     return msg_id
 
 
-def process_entities(ws, entities, dry_run=False, recreate_ids=True, verbose=False):
+def process_entities(
+    ws, entities, dry_run=False, recreate_ids=True, verbose=False, devices=None
+):
     if not entities:
         return
 
     msg_id = 100  # Start safely above list_entities id
 
-    # Fetch device registry to handle custom device names
-    devices, msg_id = common.get_device_registry(ws, msg_id)
+    # Fetch device registry to handle custom device names, unless the
+    # caller already has it from list_entities
+    if devices is None:
+        devices, msg_id = common.get_device_registry(ws, msg_id)
+
+    # Entities by ID, so applied renames touch only the renamed entries
+    entities_by_id = {e["entity_id"]: e for e in entities}
+    # Automation configs by entity ID, shared by both passes
+    automation_configs = {}
 
     # Check for automatic entity ID updates (First Pass)
     updates = []
@@ -113,62 +164,81 @@ def process_entities(ws, entities, dry_run=False, recreate_ids=True, verbose=Fal
     if recreate_ids and updates:
         if not dry_run:
             msg_id = apply_automatic_updates(ws, updates, msg_id)
-            update_local_entity_ids(entities, updates)
+            update_local_entity_ids(entities_by_id, updates)
 
         # Update automation references (First Pass)
         msg_id = update_automation_references(
-            ws, updates, msg_id, dry_run=dry_run, verbose=verbose
+            ws,
+            updates,
+            msg_id,
+            dry_run=dry_run,
+            verbose=verbose,
+            fetched_configs=automation_configs,
+        )
+
+    # Only devices with a user-defined name can change an entity's proposed
+    # name; flatten the fields the loop needs once per device, so each entity
+    # costs one lookup (and none of the device dict's .get calls). The
+    # device's default name and model become one prefix tuple, in that order
+    # of preference, so most entities are settled by a single startswith call.
+    # The user-defined name is kept left-stripped (to lead a suffix) and fully
+    # stripped (on its own), which is what stripping the joined name gave
+    renamed_devices = {
+        device_id: (
+            device["name_by_user"].lstrip(),
+            device["name_by_user"].strip(),
+            tuple(
+                prefix for prefix in (device.get("name"), device.get("model")) if prefix
+            ),
         )
+        for device_id, device in devices.items()
+        if device.get("name_by_user")
+    }
 
     # Prepare data for table
     # Columns: Entity ID, Current Name, Proposed Name
+    # The changes to apply are collected alongside as (entity_id, new_name)
+    # pairs, so nothing has to be parsed back out of the display strings
     table_data = []
+    append = table_data.append
+    name_changes = []
+    get_renamed_device = renamed_devices.get
     for e in entities:
         current_name = e.get("name")
 
         # Determine proposed name
         target_name = None  # Default target is None (reset to default)
 
-        device_id = e.get("device_id")
-        if device_id and device_id in devices:
-            device = devices[device_id]
-            user_device_name = device.get("name_by_user")
+        renamed_device = get_renamed_device(e.get("device_id"))
+        if renamed_device:
+            user_name_lead, user_name_only, prefixes = renamed_device
             original_name = e.get("original_name")
 
-            # If the device has a user-defined name, and the entity has an original name
-            if user_device_name and original_name:
-                # Check if the original name starts with the device's *default* name
-                default_device_name = device.get("name")
-                device_model = device.get("model")
-
-                if default_device_name and original_name.startswith(
-                    default_device_name
-                ):
-                    suffix = original_name[len(default_device_name) :].strip()
-                    target_name = f"{user_device_name} {suffix}".strip()
-                elif device_model and original_name.startswith(device_model):
-                    suffix = original_name[len(device_model) :].strip()
-                    target_name = f"{user_device_name} {suffix}".strip()
+            # If the device has a user-defined name, and the entity has an
+            # original name starting with the device's *default* name (or
+            # else its model), swap that prefix for the user-defined name
+            if original_name and original_name.startswith(prefixes):
+                for prefix in prefixes:
+                    if original_name.startswith(prefix):
+                        suffix = original_name[len(prefix) :].strip()
+                        if suffix and user_name_lead:
+                            target_name = f"{user_name_lead} {suffix}"
+                        else:
+                            target_name = suffix or user_name_only
+                        break
 
         # Compare target_name with current_name
-        proposed_name = None
         if current_name != target_name:
-            if target_name is None:
-                proposed_name = "None"
-            else:
-                proposed_name = target_name
-
-        if proposed_name:
-            table_data.append((e["entity_id"], str(current_name), proposed_name))
+            name_changes.append((e["entity_id"], target_name))
+            append((e["entity_id"], str(current_name), str(target_name)))
         elif verbose:
-            table_data.append((e["entity_id"], str(current_name), "No Change"))
+            append((e["entity_id"], str(current_name), "No Change"))
 
     # Print table
     if table_data:
         print("")
         headers = ["Entity ID", "Current Name", "Proposed Name"]
-        table = [headers] + common.align_strings(table_data)
-        print(tabulate.tabulate(table, headers="firstrow", tablefmt="github"))
+        print(common.format_github_table(common.align_strings(table_data), headers))
     elif not verbose:
         print(
             "\nNo entities found with custom names (or needing updates). Use --verbose to see all matched entities."
@@ -179,92 +249,109 @@ def process_entities(ws, entities, dry_run=False, recreate_ids=True, verbose=Fal
         return
 
     # Apply name changes
-    msg_id = apply_name_changes(ws, table_data, verbose, msg_id)
+    msg_id = apply_name_changes(ws, name_changes, msg_id)
 
-    # Check for automatic entity ID updates (Second Pass)
+    # Check for automatic entity ID updates (Second Pass). The first pass
+    # already settled every other entity, so only renamed ones can have a
+    # new automatic ID now
     if recreate_ids:
         updates, msg_id = get_automatic_updates(
-            ws, [e["entity_id"] for e in entities], msg_id
+            ws, [entity_id for entity_id, _ in name_changes], msg_id
         )
 
         # Apply automatic entity ID updates (Second Pass)
         if updates:
             msg_id = apply_automatic_updates(ws, updates, msg_id)
-            update_local_entity_ids(entities, updates)
+            update_local_entity_ids(entities_by_id, updates)
 
             # Update automation references (Second Pass)
             msg_id = update_automation_references(
-                ws, updates, msg_id, dry_run=False, verbose=verbose
+                ws,
+                updates,
+                msg_id,
+                dry_run=False,
+                verbose=verbose,
+                fetched_configs=automation_configs,
             )
 
 
-def apply_name_changes(ws, table_data, verbose, msg_id):
+def apply_name_changes(ws, name_changes, msg_id):
     print("\nApplying name changes...")
-    for row in table_data:
-        entity_id = row[0]
-        proposed_name = row[2]
-
-        if proposed_name == "No Change":
-            continue
-
-        # Convert "None" string back to actual None
-        new_name = None if proposed_name == "None" else proposed_name
-
+    # Pipeline the updates so the batch costs about one round trip rather
+    # than one per entity
+    payloads = []
+    for entity_id, new_name in name_changes:
         msg_id += 1
-        update_msg = {
-            "id": msg_id,
-            "type": "config/entity_registry/update",
-            "entity_id": entity_id,
-            "name": new_name,
-        }
-        ws.send(json.dumps(update_msg))
-        update_result = ws.recv()
-        update_result = json.loads(update_result)
+        payloads.append(
+            {
+                "id": msg_id,
+                "type": "config/entity_registry/update",
+                "entity_id": entity_id,
+                "name": new_name,
+            }
+        )
+    results = common.ws_batch(ws, payloads)
 
+    lines = []
+    for payload in payloads:
+        entity_id = payload["entity_id"]
+        update_result = results[payload["id"]]
         if update_result["success"]:
-            print(f"Successfully updated {entity_id} to '{new_name}'")
+            lines.append(f"Successfully updated {entity_id} to '{payload['name']}'")
         else:
             error_msg = update_result.get("error", {}).get("message", "Unknown error")
-            print(f"Failed to update {entity_id}: {error_msg}")
+            lines.append(f"Failed to update {entity_id}: {error_msg}")
+    if lines:
+        print("\n".join(lines))
+
+    # Entity names changed, so the cached entity registry is stale
+    if payloads:
+        common.clear_registry_cache()
 
     return msg_id
 
 
 def get_automatic_updates(ws, entity_ids, msg_id):
     print("\nChecking for automatic entity ID updates...")
-    msg_id += 1
-    ws.send(
-        json.dumps(
+    if not entity_ids:
+        print("No automatic entity ID updates found.")
+        return [], msg_id
+
+    # Ask in pipelined chunks rather than one request for every entity, so
+    # Home Assistant never has to build (and we parse) one huge reply
+    payloads = []
+    for start in range(0, len(entity_ids), AUTOMATIC_IDS_CHUNK_SIZE):
+        msg_id += 1
+        payloads.append(
             {
                 "id": msg_id,
                 "type": "config/entity_registry/get_automatic_entity_ids",
-                "entity_ids": entity_ids,
+                "entity_ids": entity_ids[start : start + AUTOMATIC_IDS_CHUNK_SIZE],
             }
         )
-    )
-    result = ws.recv()
-    result = json.loads(result)
+    results = common.ws_batch(ws, payloads)
 
     updates = []
-    if result["success"]:
+    failed = 0
+    for payload in payloads:
+        result = results[payload["id"]]
+        if not result["success"]:
+            failed += len(payload["entity_ids"])
+            continue
         res_map = result["result"]
         for entity_id, new_entity_id in res_map.items():
             if new_entity_id and new_entity_id != entity_id:
                 updates.append((entity_id, new_entity_id))
 
-        if updates:
-            print("\nThe following Entity IDs will be updated:")
-            print(
-                tabulate.tabulate(
-                    updates,
-                    headers=["Current Entity ID", "New Entity ID"],
-                    tablefmt="github",
-                )
-            )
-        else:
-            print("No automatic entity ID updates found.")
-    else:
-        print("Failed to get automatic entity IDs.")
+    if updates:
+        print("\nThe following Entity IDs will be updated:")
+        print(
+            common.format_github_table(updates, ["Current Entity ID", "New Entity ID"])
+        )
+    elif not failed:
+        print("No automatic entity ID updates found.")
+    if failed:
+        print(f"Failed to get automatic entity IDs for {failed} entities.")
 
     return updates, msg_id
 
@@ -274,32 +361,46 @@ def apply_automatic_updates(ws, updates, msg_id):
         return msg_id
 
     print("\nApplying automatic entity ID updates...")
+    payloads = []
     for entity_id, new_entity_id in updates:
         msg_id += 1
-        update_msg = {
-            "id": msg_id,
-            "type": "config/entity_registry/update",
-            "entity_id": entity_id,
-            "new_entity_id": new_entity_id,
-        }
-        ws.send(json.dumps(update_msg))
-        result = ws.recv()
-        result = json.loads(result)
+        payloads.append(
+            {
+                "id": msg_id,
+                "type": "config/entity_registry/update",
+                "entity_id": entity_id,
+                "new_entity_id": new_entity_id,
+            }
+        )
+    results = common.ws_batch(ws, payloads)
 
+    lines = []
+    for payload in payloads:
+        entity_id = payload["entity_id"]
+        new_entity_id = payload["new_entity_id"]
+        result = results[payload["id"]]
         if result["success"]:
-            print(f"Successfully renamed {entity_id} to {new_entity_id}")
+            lines.append(f"Successfully renamed {entity_id} to {new_entity_id}")
         else:
             error_msg = result.get("error", {}).get("message", "Unknown error")
-            print(f"Failed to rename {entity_id}: {error_msg}")
+            lines.append(f"Failed to rename {entity_id}: {error_msg}")
+    print("\n".join(lines))
+
+    # Entity IDs changed, so cached entity lists are stale
+    common.clear_registry_cache()
 
     return msg_id
 
 
-def update_local_entity_ids(target_entities, updates):
-    update_map = {old: new for old, new in updates}
-    for e in target_entities:
-        if e["entity_id"] in update_map:
-            e["entity_id"] = update_map[e["entity_id"]]
+def update_local_entity_ids(entities_by_id, updates):
+    # Re-key each renamed entity in place rather than scanning every entity;
+    # pop everything first so a chain of renames cannot clobber an entry
+    renamed = [
+        (entities_by_id.pop(old), new) for old, new in updates if old in entities_by_id
+    ]
+    for e, new in renamed:
+        e["entity_id"] = new
+        entities_by_id[new] = e
 
 
 if __name__ == "__main__":
@@ -324,13 +425,24 @@ if __name__ == "__main__":
         action="store_true",
         help="Show all entities, including those with empty names",
     )
+    parser.add_argument(
+        "--no-cache",
+        dest="use_cache",
+        action="store_false",
+        help="Ignore cached entity and device registries from previous dry runs",
+    )
     parser.set_defaults(recreate_ids=True)
     argcomplete.autocomplete(parser)
     args = parser.parse_args()
+    # The registries drive the entity registry writes, so only dry runs may
+    # read them from the cache: a device renamed in the UI since the last
+    # run would otherwise yield stale names and entity IDs
+    if not args.use_cache or not args.dry_run:
+        common.REGISTRY_CACHE_TTL = 0
 
     with common.websocket_context() as ws:
         if ws:
-            entities = list_entities(ws, args.search_regex)
+            entities, devices = list_entities(ws, args.search_regex)
             process_entities(
-                ws, entities, args.dry_run, args.recreate_ids, args.verbose
+                ws, entities, args.dry_run, args.recreate_ids, args.verbose, devices
             )
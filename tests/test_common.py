@@ -0,0 +1,62 @@
+import importlib.machinery
+import importlib.util
+import os
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# common imports config at module level; fall back to the example config
+# when no config.py has been set up
+if importlib.util.find_spec("config") is None:
+    loader = importlib.machinery.SourceFileLoader(
+        "config", os.path.join(ROOT, "config.py.example")
+    )
+    spec = importlib.util.spec_from_loader("config", loader)
+    sys.modules["config"] = importlib.util.module_from_spec(spec)
+    loader.exec_module(sys.modules["config"])
+
+import tabulate  # noqa: E402
+
+import common  # noqa: E402
+
+tabulate.PRESERVE_WHITESPACE = True
+
+
+class FormatGithubTableTest(unittest.TestCase):
+    headers = ("Entity ID", "Missing Entity")
+
+    def make_rows(self, count):
+        return [
+            (f"automation.room_{i}", f"light.lamp_{i % 7}  " if i % 3 else "")
+            for i in range(count)
+        ]
+
+    def assert_matches_tabulate(self, rows, headers=None):
+        headers = headers or self.headers
+        self.assertEqual(
+            common.format_github_table(rows, headers),
+            tabulate.tabulate(rows, headers=headers, tablefmt="github"),
+        )
+
+    def test_below_min_rows(self):
+        self.assert_matches_tabulate(self.make_rows(common.GITHUB_TABLE_MIN_ROWS - 1))
+
+    def test_at_and_above_min_rows(self):
+        for count in (common.GITHUB_TABLE_MIN_ROWS, common.GITHUB_TABLE_MIN_ROWS * 5):
+            with self.subTest(count=count):
+                self.assert_matches_tabulate(self.make_rows(count))
+
+    def test_wide_headers(self):
+        rows = [("a", "b")] * common.GITHUB_TABLE_MIN_ROWS
+        self.assert_matches_tabulate(rows, ("Long Header One", "Long Header Two"))
+
+    def test_falls_back_for_numbers_and_unicode(self):
+        count = common.GITHUB_TABLE_MIN_ROWS
+        self.assert_matches_tabulate([(str(i), "x") for i in range(count)])
+        self.assert_matches_tabulate([("sensor.café", "x")] * count)
+
+
+if __name__ == "__main__":
+    unittest.main()